@@ -1,21 +1,239 @@
-from fastapi import FastAPI
+from backend.src.startup import StartupReport
+
+STARTUP = StartupReport()
+
+with STARTUP.phase("import_fastapi"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from model.xgboost_classifier import XGBoostModel
-from backend.src.handlers import router
-from backend.src.db import ShelveDB
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import typing as tp
+with STARTUP.phase("import_model"):
+    from model.xgboost_classifier import XGBoostModel
+with STARTUP.phase("import_backend"):
+    from backend.src.handlers import router, admin_router, health_router
+    from backend.src.db import get_db
+    from backend.src.batching import MicroBatcher
+    from backend.src.executors import BoundedExecutor
+    from backend.src.cache import ResultCache
+    from backend.src.write_behind import WriteBehindQueue
+    from backend.src.record_log import RecordLogDB, run_compaction
+    from backend.src.profiling import ProfileStore, ProfilingMiddleware
+    from backend.src.model_manager import ModelManager, ModelVersionMiddleware
+    from backend.src.counterfactuals import CounterfactualGrid
+    from backend.src.features import feature_registry
+    from backend.src.monitoring import FeatureMonitor
+    from backend.src.admission import AdmissionController, EXPLAIN_ROUTES, PREDICT_ROUTES
+    from model.registry import ModelRegistry
+    from backend.src import config
+
+
+REGISTRY = ModelRegistry(config.MODEL_REGISTRY_DIR)
+
+
+def load_model(model_path: str, shared_path: str) -> XGBoostModel:
+    return XGBoostModel(
+        model_path=model_path,
+        engine=config.INFERENCE_ENGINE,
+        engine_max_rows=config.INFERENCE_ENGINE_MAX_ROWS,
+        explain_engine=config.EXPLAIN_ENGINE,
+        shared_path=shared_path if config.MODEL_SERVING == "shared" else None,
+    )
+
 
+def load_classifier() -> tp.Tuple[XGBoostModel, tp.Optional[str]]:
+    """Loads the registry's active version, or MODEL_PATH when nothing is active."""
+    with STARTUP.phase("model_init"):
+        name = REGISTRY.active()
+        if name is None:
+            return load_model(config.MODEL_PATH, config.MODEL_BINARY_PATH), None
+        return load_model(REGISTRY.model_path(name), REGISTRY.shared_path(name)), name
+
+
+async def warm_up(app: FastAPI):
+    try:
+        await app.state.explain_executor.run(app.state.models.current.warm_up)
+    except Exception as e:
+        print(str(e))
+    finally:
+        app.state.warmed_up = True
+
+
+if config.MODEL_PRELOAD:
+    load_classifier()
 
 
 @asynccontextmanager
 async def startup_envents(app: FastAPI):
-    app.state.classifier = XGBoostModel()
-    app.state.credit_application_db = ShelveDB("credit_application")
-    app.state.user_data_db = ShelveDB("user_data")
-    app.state.model_report_db = ShelveDB("model_report")
+    app.state.startup = STARTUP
+    app.state.ready = False
+    app.state.warmed_up = False
+    classifier, model_name = load_classifier()
+    app.state.user_data_db = get_db("user_data", config.STORAGE_BACKEND)
+    if config.EVENT_STORE == "log":
+        app.state.credit_application_db = RecordLogDB(
+            "credit_application", config.RECORD_LOG_SEGMENT_MAX_BYTES, config.RECORD_LOG_MAX_VERSIONS
+        )
+        app.state.model_report_db = RecordLogDB(
+            "model_report", config.RECORD_LOG_SEGMENT_MAX_BYTES, config.RECORD_LOG_MAX_VERSIONS
+        )
+    else:
+        app.state.credit_application_db = get_db("credit_application", config.STORAGE_BACKEND)
+        app.state.model_report_db = get_db("model_report", config.STORAGE_BACKEND)
+
+    app.state.inference_executor = BoundedExecutor(
+        "inference", config.INFERENCE_WORKERS, config.INFERENCE_CONCURRENCY
+    )
+    app.state.explain_executor = BoundedExecutor(
+        "explain", config.EXPLAIN_WORKERS, config.EXPLAIN_CONCURRENCY
+    )
+    app.state.storage_executor = BoundedExecutor(
+        "storage", config.STORAGE_WORKERS, config.STORAGE_CONCURRENCY
+    )
+    # Loads replacement models and scores shadow traffic, away from the serving pools.
+    app.state.models_executor = BoundedExecutor("models", 1)
+
+    app.state.models = ModelManager(
+        classifier,
+        REGISTRY,
+        load_model,
+        app.state.models_executor,
+        current_name=model_name,
+        shadow_max_in_flight=config.MODEL_SHADOW_MAX_IN_FLIGHT,
+    )
+    if config.MODEL_SHADOW_VERSION:
+        await app.state.models.set_shadow(config.MODEL_SHADOW_VERSION, config.MODEL_SHADOW_SAMPLE_RATE)
+    watch_task = None
+    if config.MODEL_REGISTRY_POLL_S > 0:
+        watch_task = asyncio.create_task(app.state.models.watch(config.MODEL_REGISTRY_POLL_S))
+
+    compaction_task = None
+    if config.EVENT_STORE == "log":
+        compaction_task = asyncio.create_task(run_compaction(
+            (app.state.credit_application_db, app.state.model_report_db),
+            app.state.storage_executor,
+            config.RECORD_LOG_COMPACTION_INTERVAL_S,
+        ))
+
+    app.state.write_behind = None
+    if config.WRITE_BEHIND_ENABLED:
+        app.state.write_behind = WriteBehindQueue(
+            app.state.storage_executor,
+            max_size=config.WRITE_BEHIND_MAX_SIZE,
+            batch_size=config.WRITE_BEHIND_BATCH_SIZE,
+            flush_interval_ms=config.WRITE_BEHIND_FLUSH_INTERVAL_MS,
+            put_timeout_ms=config.WRITE_BEHIND_PUT_TIMEOUT_MS,
+        )
+        await app.state.write_behind.start()
+
+    with STARTUP.phase("feature_registry"):
+        app.state.features = feature_registry()
+    app.state.counterfactual_grid = CounterfactualGrid(app.state.features)
+
+    app.state.monitor = None
+    if config.MONITORING_ENABLED:
+        app.state.monitor = FeatureMonitor(
+            app.state.features,
+            window_s=config.MONITORING_WINDOW_S,
+            windows=config.MONITORING_WINDOWS,
+            income_accuracy=config.MONITORING_INCOME_ACCURACY,
+            reference_path=config.MONITORING_REFERENCE_PATH,
+            psi_alert=config.MONITORING_PSI_ALERT,
+        )
+
+    app.state.admission = None
+    if config.ADMISSION_ENABLED:
+        explain_limits = (
+            config.ADMISSION_EXPLAIN_CONCURRENCY,
+            config.ADMISSION_EXPLAIN_QUEUE,
+            config.ADMISSION_EXPLAIN_MAX_WAIT_MS / 1000,
+        )
+        predict_limits = (
+            config.ADMISSION_PREDICT_CONCURRENCY,
+            config.ADMISSION_PREDICT_QUEUE,
+            config.ADMISSION_PREDICT_MAX_WAIT_MS / 1000,
+        )
+        app.state.admission = AdmissionController(
+            {**dict.fromkeys(EXPLAIN_ROUTES, explain_limits), **dict.fromkeys(PREDICT_ROUTES, predict_limits)},
+            degradable=("/explain",) if config.ADMISSION_EXPLAIN_DEGRADE else (),
+        )
+
+    app.state.result_cache = None
+    if config.RESULT_CACHE_ENABLED:
+        app.state.result_cache = ResultCache(
+            config.RESULT_CACHE_MAX_BYTES, config.RESULT_CACHE_TTL_SECONDS, app.state.models.current.version
+        )
+        cache = app.state.result_cache
+        app.state.models.on_activate(lambda model: cache.set_model_version(model.version))
+
+    app.state.predict_batcher = None
+    app.state.explain_batcher = None
+    if config.MICROBATCH_ENABLED:
+        app.state.predict_batcher = MicroBatcher(
+            "predict",
+            app.state.models.predict_rows,
+            executor=app.state.inference_executor,
+            max_batch_size=config.MICROBATCH_MAX_BATCH_SIZE,
+            max_wait_ms=config.MICROBATCH_MAX_WAIT_MS,
+        )
+        app.state.explain_batcher = MicroBatcher(
+            "explain",
+            app.state.models.explain_rows,
+            executor=app.state.explain_executor,
+            max_batch_size=config.MICROBATCH_MAX_BATCH_SIZE,
+            max_wait_ms=config.MICROBATCH_MAX_WAIT_MS,
+        )
+        await app.state.predict_batcher.start()
+        await app.state.explain_batcher.start()
+
+    warm_up_task = asyncio.create_task(warm_up(app)) if config.MODEL_WARMUP else None
+
+    STARTUP.mark_ready()
+    app.state.ready = True
+
     yield
 
+    app.state.ready = False
+    for task in (warm_up_task, watch_task):
+        if task is not None:
+            task.cancel()
+
+    for batcher in (app.state.predict_batcher, app.state.explain_batcher):
+        if batcher is not None:
+            await batcher.stop()
+
+    if app.state.write_behind is not None:
+        await app.state.write_behind.stop()
+
+    if compaction_task is not None:
+        compaction_task.cancel()
+        app.state.credit_application_db.close()
+        app.state.model_report_db.close()
+
+    executors = (
+        app.state.inference_executor,
+        app.state.explain_executor,
+        app.state.storage_executor,
+        app.state.models_executor,
+    )
+    for executor in executors:
+        executor.shutdown()
+
 app = FastAPI(docs_url="/", lifespan=startup_envents)
+# Not installed at all unless enabled, so unprofiled deployments pay nothing.
+app.state.profile_store = None
+if config.PROFILING_ENABLED:
+    app.state.profile_store = ProfileStore(config.PROFILING_DIR, config.PROFILING_MAX_PROFILES)
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=app.state.profile_store,
+        mode=config.PROFILING_MODE,
+        header=config.PROFILING_HEADER,
+        token=config.PROFILING_TOKEN,
+        sample_rate=config.PROFILING_SAMPLE_RATE,
+        interval_ms=config.PROFILING_SAMPLE_INTERVAL_MS,
+    )
+app.add_middleware(ModelVersionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:8501", "http://localhost:8000"],
@@ -24,3 +242,5 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.include_router(router)
+app.include_router(admin_router)
+app.include_router(health_router)
@@ -0,0 +1,163 @@
+"""Per-endpoint admission control.
+
+Each gated route has a concurrency limit and a bounded FIFO queue. Requests
+are admitted before their body is read. If the queue is full, the request is
+rejected at once with 429. If it waits in the queue longer than the route's
+deadline, it gets 503. Both carry Retry-After, estimated from the queue
+length and the recent time requests held a slot.
+
+Degradable routes (/explain) are not rejected. The handler runs without a
+slot, and `request.state.admission_overload` is set so it can answer from
+the cache or with approximate contributions.
+"""
+import asyncio
+import collections
+import math
+import time
+import typing as tp
+from fastapi import HTTPException, Request
+from backend.src.instrumentation import TimedRoute
+from backend.src.metrics import REGISTRY
+
+EXPLAIN_ROUTES = ("/explain", "/explain_batch", "/score", "/counterfactuals")
+PREDICT_ROUTES = ("/predict", "/predict_batch", "/predict_packed")
+# Weight of the latest request in the held-time moving average.
+HOLD_EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, route: str, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"{route} is overloaded ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def to_http(self) -> HTTPException:
+        return HTTPException(status_code=self.status_code, detail=str(self), headers={"Retry-After": str(self.retry_after)})
+
+
+class Gate:
+    def __init__(self, route: str, concurrency: int, queue: int, max_wait_s: float):
+        self.route = route
+        self.concurrency = concurrency
+        self.queue = queue
+        self.max_wait_s = max_wait_s
+        self.in_flight = 0
+        self._waiters: tp.Deque[asyncio.Future] = collections.deque()
+        self._hold_s = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {"queue_full": 0, "deadline": 0}
+        self.degraded = 0
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead would have drained, at least 1."""
+        return max(1, math.ceil((len(self._waiters) + 1) / self.concurrency * self._hold_s))
+
+    def _overloaded(self, reason: str, status_code: int) -> Overloaded:
+        return Overloaded(self.route, reason, status_code, self.retry_after())
+
+    async def acquire(self):
+        if self.in_flight < self.concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue:
+            raise self._overloaded("queue_full", 429)
+
+        self.queued += 1
+        REGISTRY.counter("admission_queued_total", route=self.route).inc()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait_s)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on.
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._overloaded("deadline", 503)
+            raise
+        finally:
+            REGISTRY.histogram("admission_wait_seconds", route=self.route).observe(time.perf_counter() - started)
+        self.admitted += 1
+
+    def release(self, held_s: tp.Optional[float] = None):
+        if held_s is not None:
+            self._hold_s += HOLD_EWMA_ALPHA * (held_s - self._hold_s)
+        # Hand the slot straight to the next live waiter, so in_flight stays the same.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def reject(self, overload: Overloaded):
+        self.rejected[overload.reason] += 1
+        REGISTRY.counter("admission_rejected_total", route=self.route, reason=overload.reason).inc()
+
+    def degrade(self, overload: Overloaded):
+        self.degraded += 1
+        REGISTRY.counter("admission_degraded_total", route=self.route, reason=overload.reason).inc()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "max_wait_s": self.max_wait_s,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "hold_s": round(self._hold_s, 4),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": dict(self.rejected),
+            "degraded": self.degraded,
+        }
+
+
+class AdmissionController:
+    def __init__(self, limits: tp.Dict[str, tp.Tuple[int, int, float]], degradable: tp.Sequence[str] = ()):
+        """`limits` maps a route path to (concurrency, queue, max_wait_s)."""
+        self.gates = {route: Gate(route, *route_limits) for route, route_limits in limits.items()}
+        self.degradable = frozenset(degradable)
+
+    def stats(self) -> dict:
+        return {route: gate.stats() for route, gate in self.gates.items()}
+
+
+class AdmissionRoute(TimedRoute):
+    """TimedRoute that passes requests through the app's AdmissionController, if any.
+
+    Admission sits inside the timing, so rejections are counted under their
+    status and queueing shows up in the `validate` stage.
+    """
+
+    def wrap_handler(self, handler: tp.Callable) -> tp.Callable:
+        route = self.path
+
+        async def admitted_handler(request: Request):
+            controller = getattr(request.app.state, "admission", None)
+            gate = controller.gates.get(route) if controller is not None else None
+            if gate is None:
+                return await handler(request)
+            try:
+                await gate.acquire()
+            except Overloaded as e:
+                if route not in controller.degradable:
+                    gate.reject(e)
+                    raise e.to_http()
+                gate.degrade(e)
+                request.state.admission_overload = e
+                return await handler(request)
+
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                gate.release(time.perf_counter() - started)
+
+        return admitted_handler
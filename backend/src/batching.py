@@ -0,0 +1,120 @@
+import asyncio
+import time
+import typing as tp
+import numpy as np
+from backend.src.metrics import REGISTRY
+from backend.src.executors import BoundedExecutor
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row calls into one matrix call of `fn`.
+
+    `fn` takes an (N, F) feature matrix and returns a list of N per-row results.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: tp.Callable[[np.ndarray], tp.List[tp.Any]],
+        executor: BoundedExecutor,
+        max_batch_size: int,
+        max_wait_ms: float,
+    ):
+        self.name = name
+        self._fn = fn
+        self._executor = executor
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._queue: tp.Optional[asyncio.Queue] = None
+        self._task: tp.Optional[asyncio.Task] = None
+        # Rows taken off the queue and not answered yet; failed if the task is cancelled.
+        self._batch: list = []
+
+        self.batch_size = REGISTRY.histogram("microbatch_size", BATCH_SIZE_BUCKETS, batcher=name)
+        self.queue_wait = REGISTRY.histogram("microbatch_queue_wait_seconds", QUEUE_WAIT_BUCKETS, batcher=name)
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError(f"{self.name} batcher stopped"))
+
+    async def submit(self, row: np.ndarray) -> tp.Any:
+        if self._queue is None:
+            raise RuntimeError(f"{self.name} batcher is not started")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, time.perf_counter(), future))
+        return await future
+
+    async def _collect(self) -> list:
+        batch = self._batch = [await self._queue.get()]
+        deadline = batch[0][1] + self._max_wait
+
+        while len(batch) < self._max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        try:
+            while True:
+                await self._run_batch()
+        except asyncio.CancelledError:
+            for _, _, future in self._batch:
+                if not future.done():
+                    future.set_exception(RuntimeError(f"{self.name} batcher stopped"))
+            self._batch = []
+            raise
+
+    async def _run_batch(self):
+        batch = await self._collect()
+
+        started = time.perf_counter()
+        for _, enqueued, _ in batch:
+            self.queue_wait.observe(started - enqueued)
+        self.batch_size.observe(len(batch))
+
+        features = np.stack([row for row, _, _ in batch])
+        try:
+            results = await self._executor.run(self._fn, features)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        self._batch = []
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
@@ -0,0 +1,199 @@
+"""Score (and optionally explain) a large CSV / JSONL applicant file offline.
+
+Rows are read in chunks, encoded with label_encoders.json, scored across a
+process pool and appended to the output in input order. After every written
+chunk a checkpoint next to the output records how far it got; --resume
+continues from there after a crash.
+
+Usage: python -m backend.src.bulk_score applicants.csv scores.csv
+       [--explain] [--chunk-size 10000] [--workers 4] [--resume]
+"""
+import argparse
+import concurrent.futures
+import itertools
+import json
+import os
+import time
+import typing as tp
+import numpy as np
+import pandas as pd
+from backend.src.encoding import LABEL_ENCODERS_PATH, detect_format, encode_features, encode_raw
+from backend.src.features import FeatureRegistry
+from backend.src.utils import FEATURE_COLUMNS
+
+ID_COLUMNS = ("ID", "id")
+
+_model = None
+
+
+def _init_worker(model_path: str, engine: str):
+    global _model
+    from model.xgboost_classifier import XGBoostModel
+
+    _model = XGBoostModel(model_path=model_path, engine=engine)
+
+
+def score_chunk(start: int, features: np.ndarray, errors: tp.List[tp.Optional[str]], ids: tp.Optional[list], explain: bool) -> pd.DataFrame:
+    valid = np.array([error is None for error in errors], dtype=bool)
+    output = pd.DataFrame({"row": np.arange(start, start + len(features))})
+    if ids is not None:
+        output["id"] = ids
+    output["prediction"] = pd.array([pd.NA] * len(features), dtype="Int64")
+    output["probability"] = np.nan
+    output["error"] = errors
+    # Level columns exist in every chunk, even one without valid rows, so the output schema never changes.
+    if explain:
+        for column in FEATURE_COLUMNS:
+            output[f"level_{column}"] = pd.array([pd.NA] * len(features), dtype="Int64")
+
+    if valid.any():
+        results = _model.score_batch(features[valid]) if explain else _model.predict_batch(features[valid])
+        output.loc[valid, "prediction"] = [result["prediction"] for result in results]
+        output.loc[valid, "probability"] = [result["probability"] for result in results]
+        if explain:
+            levels = pd.DataFrame([result["importance_levels"] for result in results], index=output.index[valid])
+            for column in FEATURE_COLUMNS:
+                output.loc[valid, f"level_{column}"] = levels[column]
+
+    return output
+
+
+def read_chunks(path: str, chunk_size: int, skip_rows: int) -> tp.Iterator[pd.DataFrame]:
+    if path.endswith(".jsonl") or path.endswith(".ndjson"):
+        with open(path) as f:
+            # Blank lines are not records; skip and count the same non-blank lines that rows_done counts.
+            records = itertools.islice((line for line in f if line.strip()), skip_rows, None)
+            while True:
+                chunk = [json.loads(line) for line in itertools.islice(records, chunk_size)]
+                if not chunk:
+                    return
+                yield pd.DataFrame.from_records(chunk)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=range(1, skip_rows + 1))
+
+
+def encode_chunk(frame: pd.DataFrame, registry: FeatureRegistry) -> tp.Tuple[np.ndarray, list, tp.Optional[list]]:
+    if detect_format(frame.columns) == "raw":
+        features, errors = encode_raw(frame, registry)
+    else:
+        features, errors = encode_features(frame, registry)
+    id_column = next((column for column in ID_COLUMNS if column in frame.columns), None)
+    ids = frame[id_column].tolist() if id_column is not None else None
+    return features, errors, ids
+
+
+class Checkpoint:
+    """Progress marker written atomically after each chunk is durably appended."""
+
+    def __init__(self, output_path: str, input_path: str, chunk_size: int):
+        self.path = f"{output_path}.checkpoint"
+        self.identity = {
+            "input": os.path.abspath(input_path),
+            "input_size": os.path.getsize(input_path),
+            "chunk_size": chunk_size,
+        }
+        self.rows_done = 0
+        self.output_bytes = 0
+
+    def load(self):
+        with open(self.path) as f:
+            state = json.load(f)
+        if {key: state.get(key) for key in self.identity} != self.identity:
+            raise ValueError(f"{self.path} was written for a different input or chunk size")
+        self.rows_done, self.output_bytes = state["rows_done"], state["output_bytes"]
+
+    def save(self, rows_done: int, output_bytes: int):
+        self.rows_done, self.output_bytes = rows_done, output_bytes
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**self.identity, "rows_done": rows_done, "output_bytes": output_bytes}, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def write_chunk(output, frame: pd.DataFrame, fmt: str, header: bool):
+    if fmt == "jsonl":
+        records = frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+        output.write("".join(json.dumps(record, default=str) + "\n" for record in records).encode())
+    else:
+        output.write(frame.to_csv(index=False, header=header).encode())
+    output.flush()
+    os.fsync(output.fileno())
+
+
+def run(args) -> int:
+    fmt = "jsonl" if args.output.endswith((".jsonl", ".ndjson")) else "csv"
+    checkpoint = Checkpoint(args.output, args.input, args.chunk_size)
+    if args.resume and os.path.exists(checkpoint.path):
+        checkpoint.load()
+        print(f"Resuming after {checkpoint.rows_done} rows")
+    elif os.path.exists(args.output) and not args.overwrite:
+        raise SystemExit(f"{args.output} exists; pass --resume to continue or --overwrite to start over")
+
+    registry = FeatureRegistry.load(args.encoders)
+    rows_done = resumed_from = checkpoint.rows_done
+    max_pending = args.workers * 2
+    started = time.perf_counter()
+
+    with open(args.output, "r+b" if checkpoint.output_bytes else "wb") as output, \
+            concurrent.futures.ProcessPoolExecutor(
+                max_workers=args.workers, initializer=_init_worker, initargs=(args.model, args.engine)
+            ) as pool:
+        # Drop anything written after the last checkpoint.
+        output.truncate(checkpoint.output_bytes)
+        output.seek(checkpoint.output_bytes)
+
+        pending: tp.Dict[int, concurrent.futures.Future] = {}
+        next_to_write = submitted = 0
+        chunks = read_chunks(args.input, args.chunk_size, checkpoint.rows_done)
+        exhausted = False
+        offset = checkpoint.rows_done
+
+        while not exhausted or pending:
+            while not exhausted and len(pending) < max_pending:
+                frame = next(chunks, None)
+                if frame is None:
+                    exhausted = True
+                    break
+                features, errors, ids = encode_chunk(frame, registry)
+                pending[submitted] = pool.submit(score_chunk, offset, features, errors, ids, args.explain)
+                offset += len(frame)
+                submitted += 1
+
+            if not pending:
+                break
+            scored = pending.pop(next_to_write).result()
+            write_chunk(output, scored, fmt, header=output.tell() == 0)
+            next_to_write += 1
+            rows_done += len(scored)
+            checkpoint.save(rows_done, output.tell())
+            elapsed = time.perf_counter() - started
+            print(f"{rows_done} rows scored ({(rows_done - resumed_from) / elapsed:.0f} rows/s)")
+
+    checkpoint.remove()
+    return rows_done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSONL file of raw application records or encoded features")
+    parser.add_argument("output", help="Output path; .jsonl writes JSON lines, anything else CSV")
+    parser.add_argument("--explain", action="store_true", help="Add per-feature importance levels")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--model", default="model/xgboost_model.json")
+    parser.add_argument("--engine", default="xgboost", choices=["xgboost", "numpy", "auto"])
+    parser.add_argument("--encoders", default=LABEL_ENCODERS_PATH)
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint next to the output")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    rows = run(args)
+    print(f"Done: {rows} rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
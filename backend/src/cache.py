@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+import typing as tp
+from collections import OrderedDict
+import numpy as np
+
+
+def feature_key(kind: str, features: np.ndarray) -> tp.Tuple:
+    return (kind, *features.ravel().tolist())
+
+
+def _approx_size(obj: tp.Any) -> int:
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_approx_size(k) + _approx_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_approx_size(item) for item in obj)
+    return size
+
+
+class ResultCache:
+    """LRU cache with a TTL and a byte budget for model outputs.
+
+    Entries belong to the model version being served. `set_model_version`
+    (called by ModelManager on a swap) drops everything cached for the
+    previous one; gets and puts for any other version, e.g. from requests
+    still running on the old model, are misses and no-ops.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, model_version: tp.Optional[str] = None):
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[tp.Tuple, tp.Tuple[float, int, tp.Any]]" = OrderedDict()
+        self._bytes = 0
+        self._model_version = model_version
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def set_model_version(self, model_version: str):
+        with self._lock:
+            if model_version == self._model_version:
+                return
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._model_version = model_version
+
+    def _pop(self, key: tp.Tuple):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: tp.Tuple, model_version: str) -> tp.Optional[tp.Any]:
+        with self._lock:
+            entry = self._entries.get(key) if model_version == self._model_version else None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                self._pop(key)
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tp.Tuple, model_version: str, value: tp.Any):
+        size = _approx_size(key) + _approx_size(value)
+        if size > self._max_bytes:
+            return
+
+        with self._lock:
+            if model_version != self._model_version:
+                return
+            if key in self._entries:
+                self._pop(key)
+
+            self._entries[key] = (time.monotonic() + self._ttl, size, value)
+            self._bytes += size
+
+            while self._bytes > self._max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model_version": self._model_version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,107 @@
+import os
+
+
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "1000"))
+# Row limit of one /predict_packed body.
+PACKED_MAX_ROWS = int(os.getenv("PACKED_MAX_ROWS", "100000"))
+
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_MAX_BATCH_SIZE = int(os.getenv("MICROBATCH_MAX_BATCH_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+INFERENCE_CONCURRENCY = int(os.getenv("INFERENCE_CONCURRENCY", str(INFERENCE_WORKERS)))
+EXPLAIN_WORKERS = int(os.getenv("EXPLAIN_WORKERS", "2"))
+EXPLAIN_CONCURRENCY = int(os.getenv("EXPLAIN_CONCURRENCY", str(EXPLAIN_WORKERS)))
+STORAGE_WORKERS = int(os.getenv("STORAGE_WORKERS", "4"))
+STORAGE_CONCURRENCY = int(os.getenv("STORAGE_CONCURRENCY", str(STORAGE_WORKERS)))
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "600"))
+
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "xgboost")
+INFERENCE_ENGINE_MAX_ROWS = int(os.getenv("INFERENCE_ENGINE_MAX_ROWS", "32"))
+EXPLAIN_ENGINE = os.getenv("EXPLAIN_ENGINE", "native")
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "shelve")
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+WRITE_BEHIND_MAX_SIZE = int(os.getenv("WRITE_BEHIND_MAX_SIZE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", "200"))
+WRITE_BEHIND_PUT_TIMEOUT_MS = float(os.getenv("WRITE_BEHIND_PUT_TIMEOUT_MS", "100"))
+
+# "db" keeps applications and model reports in STORAGE_BACKEND, "log" in an append-only record log.
+# The record log has a single writer process, so "log" requires running one server worker.
+EVENT_STORE = os.getenv("EVENT_STORE", "db")
+RECORD_LOG_SEGMENT_MAX_BYTES = int(os.getenv("RECORD_LOG_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+RECORD_LOG_MAX_VERSIONS = int(os.getenv("RECORD_LOG_MAX_VERSIONS", "0"))
+RECORD_LOG_COMPACTION_INTERVAL_S = float(os.getenv("RECORD_LOG_COMPACTION_INTERVAL_S", "3600"))
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+
+# Every /admin route (model swaps, shadow scoring, exports, profiles, stats) needs ADMIN_TOKEN in
+# ADMIN_TOKEN_HEADER; with no token configured the admin routes are disabled (404).
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+ADMIN_TOKEN_HEADER = os.getenv("ADMIN_TOKEN_HEADER", "X-Admin-Token")
+
+# /counterfactuals: at most this many changed rows are scored per request, and pairs
+# of changes are only tried while the single-change pass stayed within the budget.
+COUNTERFACTUAL_MAX_CANDIDATES = int(os.getenv("COUNTERFACTUAL_MAX_CANDIDATES", "2000"))
+COUNTERFACTUAL_BUDGET_MS = float(os.getenv("COUNTERFACTUAL_BUDGET_MS", "250"))
+COUNTERFACTUAL_LIMIT = int(os.getenv("COUNTERFACTUAL_LIMIT", "5"))
+
+MODEL_PATH = os.getenv("MODEL_PATH", "model/xgboost_model.json")
+# Category label <-> code mappings written by training; the feature registry is built from it.
+LABEL_ENCODERS_PATH = os.getenv("LABEL_ENCODERS_PATH", "model/data/label_encoders.json")
+# Versioned artifacts; when its ACTIVE pointer is set it takes precedence over MODEL_PATH.
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "model/registry")
+# Seconds between checks of the registry's ACTIVE pointer; 0 disables the watcher.
+MODEL_REGISTRY_POLL_S = float(os.getenv("MODEL_REGISTRY_POLL_S", "0"))
+# Registry version scored in the background on a sample of traffic for comparison.
+MODEL_SHADOW_VERSION = os.getenv("MODEL_SHADOW_VERSION", "")
+MODEL_SHADOW_SAMPLE_RATE = float(os.getenv("MODEL_SHADOW_SAMPLE_RATE", "0.1"))
+MODEL_SHADOW_MAX_IN_FLIGHT = int(os.getenv("MODEL_SHADOW_MAX_IN_FLIGHT", "4"))
+
+# "process" loads the model in every worker, "shared" maps MODEL_BINARY_PATH read-only so workers share its pages.
+MODEL_SERVING = os.getenv("MODEL_SERVING", "process")
+MODEL_BINARY_PATH = os.getenv("MODEL_BINARY_PATH", "model/xgboost_model.bin")
+# Build the model at import time so `gunicorn --preload` loads it once before forking workers.
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "false").lower() == "true"
+
+# Build the explanation path (booster, shap) in the background right after startup.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "false").lower() == "true"
+READINESS_REQUIRES_WARMUP = os.getenv("READINESS_REQUIRES_WARMUP", "false").lower() == "true"
+
+# Rolling feature / score sketches: MONITORING_WINDOWS windows of MONITORING_WINDOW_S seconds each,
+# compared with a reference profile of the training data (python -m backend.src.monitoring).
+MONITORING_ENABLED = os.getenv("MONITORING_ENABLED", "true").lower() == "true"
+MONITORING_WINDOW_S = float(os.getenv("MONITORING_WINDOW_S", "300"))
+MONITORING_WINDOWS = int(os.getenv("MONITORING_WINDOWS", "12"))
+MONITORING_INCOME_ACCURACY = float(os.getenv("MONITORING_INCOME_ACCURACY", "0.01"))
+MONITORING_REFERENCE_PATH = os.getenv("MONITORING_REFERENCE_PATH", "model/data/reference_profile.json")
+MONITORING_PSI_ALERT = float(os.getenv("MONITORING_PSI_ALERT", "0.2"))
+
+# Admission control, per route: at most *_CONCURRENCY requests in flight, *_QUEUE more waiting (429 beyond that)
+# for up to *_MAX_WAIT_MS (503 after). Explanation routes are /explain, /explain_batch, /score and /counterfactuals.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_EXPLAIN_CONCURRENCY = int(os.getenv("ADMISSION_EXPLAIN_CONCURRENCY", str(EXPLAIN_CONCURRENCY)))
+ADMISSION_EXPLAIN_QUEUE = int(os.getenv("ADMISSION_EXPLAIN_QUEUE", "16"))
+ADMISSION_EXPLAIN_MAX_WAIT_MS = float(os.getenv("ADMISSION_EXPLAIN_MAX_WAIT_MS", "1000"))
+ADMISSION_PREDICT_CONCURRENCY = int(os.getenv("ADMISSION_PREDICT_CONCURRENCY", str(INFERENCE_CONCURRENCY * 16)))
+ADMISSION_PREDICT_QUEUE = int(os.getenv("ADMISSION_PREDICT_QUEUE", "256"))
+ADMISSION_PREDICT_MAX_WAIT_MS = float(os.getenv("ADMISSION_PREDICT_MAX_WAIT_MS", "250"))
+# Answer an overloaded /explain from the result cache or approximate (Saabas) contributions instead of rejecting it.
+ADMISSION_EXPLAIN_DEGRADE = os.getenv("ADMISSION_EXPLAIN_DEGRADE", "true").lower() == "true"
+
+# Opt-in request profiling. Requests carrying PROFILING_HEADER (equal to PROFILING_TOKEN when set)
+# or picked at PROFILING_SAMPLE_RATE are profiled with cProfile or a stack sampler.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_MODE = os.getenv("PROFILING_MODE", "cprofile")
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "5"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "backend/src/profiles")
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
@@ -0,0 +1,183 @@
+"""Candidate grids for "what would change the decision" queries.
+
+Only features an applicant can plausibly act on are varied. Each candidate
+changes one or two of them; its cost is the number of changed features first,
+then the summed per-feature distance, so sorting by cost puts the smallest
+changes first.
+"""
+import time
+import typing as tp
+import numpy as np
+from backend.src.features import FEATURE_COLUMNS, FeatureRegistry
+
+INCOME_BANDS = (27000, 45000, 67500, 90000, 112500, 135000, 157500, 180000, 225000, 270000, 315000, 360000, 450000)
+
+# Ordinal features list their labels from lowest to highest; they may only move up
+# (nobody can shed years of employment or education to get approved).
+ORDINAL_LABELS = {
+    "years_employed_cat": ("0", "1-3", "4-10", "10+"),
+    "code_education_type": (
+        "Lower secondary",
+        "Secondary / secondary special",
+        "Incomplete higher",
+        "Higher education",
+        "Academic degree",
+    ),
+}
+# Categorical features that may take any value of their domain.
+CATEGORICAL_FEATURES = ("flag_own_car", "flag_own_realty", "code_income_type", "code_housing_type", "code_occupation_type")
+
+
+class Singles:
+    """All feasible one-feature changes of a row: column index, new value, cost."""
+
+    def __init__(self, columns: np.ndarray, values: np.ndarray, costs: np.ndarray):
+        self.columns = columns
+        self.values = values
+        self.costs = costs
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+
+class CounterfactualGrid:
+    def __init__(self, features: FeatureRegistry):
+        self._categorical = {
+            features.index(feature): np.array(sorted(features[feature].codes), dtype=np.int64)
+            for feature in CATEGORICAL_FEATURES
+        }
+        # code -> rank, as an array indexed by code.
+        self._ordinal = {}
+        for feature, labels in ORDINAL_LABELS.items():
+            codes = [features[feature].labels[label] for label in labels]
+            ranks = np.empty(len(codes), dtype=np.int64)
+            ranks[codes] = np.arange(len(codes))
+            self._ordinal[features.index(feature)] = (np.array(codes, dtype=np.int64), ranks)
+        self._income_column = features.index("amt_income_total")
+        self._income_bands = np.array(INCOME_BANDS, dtype=np.int64)
+
+    def singles(self, row: np.ndarray) -> Singles:
+        columns, values, costs = [], [], []
+
+        def add(column: int, new_values: np.ndarray, new_costs: np.ndarray):
+            keep = new_values != row[column]
+            columns.append(np.full(keep.sum(), column, dtype=np.int64))
+            values.append(new_values[keep])
+            costs.append(new_costs[keep])
+
+        for column, domain in self._categorical.items():
+            add(column, domain, np.ones(len(domain)))
+
+        for column, (codes_by_rank, ranks) in self._ordinal.items():
+            current = row[column]
+            if not 0 <= current < len(ranks):
+                continue
+            higher = codes_by_rank[ranks[current] + 1:]
+            add(column, higher, (ranks[higher] - ranks[current]) / (len(ranks) - 1))
+
+        income = row[self._income_column]
+        # Relative change, capped so a large raise never costs more than two category switches.
+        income_costs = np.minimum(np.abs(self._income_bands - income) / max(income, 1), 2.0)
+        add(self._income_column, self._income_bands, income_costs)
+
+        return Singles(np.concatenate(columns), np.concatenate(values), np.concatenate(costs))
+
+    @staticmethod
+    def single_rows(row: np.ndarray, singles: Singles) -> np.ndarray:
+        rows = np.tile(row, (len(singles), 1))
+        rows[np.arange(len(singles)), singles.columns] = singles.values
+        return rows
+
+    @staticmethod
+    def pairs(singles: Singles, excluded: np.ndarray, max_pairs: int) -> tp.Tuple[np.ndarray, np.ndarray]:
+        """Indices (i, j) into `singles` of the cheapest two-feature changes.
+
+        Pairs on the same feature and pairs containing an `excluded` single
+        (one that already flips the decision on its own) are skipped.
+        """
+        first, second = np.triu_indices(len(singles), k=1)
+        keep = (singles.columns[first] != singles.columns[second]) & ~excluded[first] & ~excluded[second]
+        first, second = first[keep], second[keep]
+        order = np.argsort(singles.costs[first] + singles.costs[second], kind="stable")[:max(max_pairs, 0)]
+        return first[order], second[order]
+
+    @staticmethod
+    def pair_rows(row: np.ndarray, singles: Singles, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        rows = np.tile(row, (len(first), 1))
+        index = np.arange(len(first))
+        rows[index, singles.columns[first]] = singles.values[first]
+        rows[index, singles.columns[second]] = singles.values[second]
+        return rows
+
+
+def _score(model, rows: np.ndarray) -> tp.Tuple[np.ndarray, np.ndarray]:
+    results = model.predict_batch(rows)
+    predictions = np.fromiter((result["prediction"] for result in results), dtype=np.int64, count=len(results))
+    probabilities = np.fromiter((result["probability"] for result in results), dtype=np.float64, count=len(results))
+    return predictions, probabilities
+
+
+def search(
+    model,
+    grid: CounterfactualGrid,
+    row: np.ndarray,
+    max_changes: int,
+    limit: int,
+    max_candidates: int,
+    budget_s: float,
+) -> dict:
+    """Scores single changes, then (budget permitting) pairs, each phase in one model call.
+
+    Pairs are only tried when the singles did not already produce `limit`
+    flips, and never include a single that flips on its own, since that pair
+    would not be a minimal change.
+    """
+    started = time.perf_counter()
+    base_prediction, base_probability = _score(model, row[np.newaxis, :])
+    base_prediction = int(base_prediction[0])
+
+    singles = grid.singles(row)
+    take = min(len(singles), max_candidates)
+    predictions, probabilities = _score(model, grid.single_rows(row, singles)[:take])
+    flipped = np.zeros(len(singles), dtype=bool)
+    flipped[:take] = predictions != base_prediction
+    found = [
+        ((singles.columns[i],), (singles.values[i],), predictions[i], probabilities[i], singles.costs[i])
+        for i in np.flatnonzero(flipped)
+    ]
+    scored = take
+    budget_exhausted = take < len(singles)
+
+    if max_changes >= 2 and len(found) < limit and not budget_exhausted:
+        if time.perf_counter() - started >= budget_s:
+            budget_exhausted = True
+        else:
+            first, second = grid.pairs(singles, flipped, max_candidates - scored)
+            predictions, probabilities = _score(model, grid.pair_rows(row, singles, first, second))
+            scored += len(first)
+            for k in np.flatnonzero(predictions != base_prediction):
+                i, j = first[k], second[k]
+                found.append((
+                    (singles.columns[i], singles.columns[j]),
+                    (singles.values[i], singles.values[j]),
+                    predictions[k],
+                    probabilities[k],
+                    singles.costs[i] + singles.costs[j],
+                ))
+
+    found.sort(key=lambda candidate: (len(candidate[0]), candidate[4]))
+    return {
+        "pred": base_prediction,
+        "proba": float(base_probability[0]),
+        "counterfactuals": [
+            {
+                "changes": {FEATURE_COLUMNS[column]: int(value) for column, value in zip(columns, values)},
+                "pred": int(prediction),
+                "proba": float(probability),
+                "cost": round(float(cost), 4),
+            }
+            for columns, values, prediction, probability, cost in found[:limit]
+        ],
+        "candidates_scored": scored,
+        "budget_exhausted": budget_exhausted,
+    }
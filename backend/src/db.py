@@ -1,31 +1,234 @@
+import abc
+import contextlib
+import pickle
 import shelve
-from typing import Any
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import os
+from backend.src.metrics import storage_op
 
+DB_DIR = os.path.join(os.path.dirname(__file__), "db")
 
-class ShelveDB:
+# (key, value, last write time or None when the backend does not track it)
+Record = Tuple[str, Any, Optional[float]]
+
+
+class BaseDB(abc.ABC):
     def __init__(self, db_name: str):
-        self.db_path = os.path.join(os.path.dirname(__file__), "db")
+        self.db_path = DB_DIR
         os.makedirs(self.db_path, exist_ok=True)
         self.db_name = db_name
 
+    @abc.abstractmethod
     def write(self, key: str, value: Any):
-        with shelve.open(os.path.join(self.db_path, self.db_name)) as db:
+        ...
+
+    @abc.abstractmethod
+    def read(self, key: str) -> Any:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abc.abstractmethod
+    def list_keys(self) -> List[str]:
+        ...
+
+    @abc.abstractmethod
+    def read_all(self) -> Dict[str, Any]:
+        ...
+
+    def write_many(self, items: Iterable[Tuple[str, Any]]):
+        for key, value in items:
+            self.write(key, value)
+
+    def iter_items(
+        self,
+        cursor: Optional[str] = None,
+        prefix: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        page_size: int = 500,
+    ) -> Iterator[Record]:
+        """Yields records in key order, starting after `cursor`.
+
+        Passing the last key received as `cursor` resumes an interrupted scan.
+        """
+        if since is not None or until is not None:
+            raise ValueError(f"{type(self).__name__} does not record write times")
+        keys = filter_keys(self.list_keys(), cursor, prefix)
+        for start in range(0, len(keys), page_size):
+            for key, value in self._read_page(keys[start:start + page_size]):
+                yield key, value, None
+
+    def _read_page(self, keys: List[str]) -> Iterable[Tuple[str, Any]]:
+        return ((key, self.read(key)) for key in keys)
+
+
+def filter_keys(keys: Iterable[str], cursor: Optional[str], prefix: Optional[str]) -> List[str]:
+    return sorted(
+        key for key in keys
+        if (cursor is None or key > cursor) and (prefix is None or key.startswith(prefix))
+    )
+
+
+# dbm.dumb, shelve's fallback backend, rewrites its index file on every open
+# and is not thread-safe, so every open of one file is serialized.
+_shelve_locks: Dict[str, threading.Lock] = {}
+_shelve_locks_guard = threading.Lock()
+
+
+class ShelveDB(BaseDB):
+    def __init__(self, db_name: str):
+        super().__init__(db_name)
+        self.file_path = os.path.join(self.db_path, db_name)
+        with _shelve_locks_guard:
+            self._lock = _shelve_locks.setdefault(self.file_path, threading.Lock())
+
+    @contextlib.contextmanager
+    def _open(self, flag: str = "c") -> Iterator[shelve.Shelf]:
+        with self._lock, shelve.open(self.file_path, flag=flag) as db:
+            yield db
+
+    @storage_op("shelve", "write")
+    def write(self, key: str, value: Any):
+        with self._open() as db:
             db[key] = value
 
+    @storage_op("shelve", "write_many")
+    def write_many(self, items: Iterable[Tuple[str, Any]]):
+        with self._open() as db:
+            for key, value in items:
+                db[key] = value
+
+    @storage_op("shelve", "read")
     def read(self, key: str) -> Any:
-        with shelve.open(os.path.join(self.db_path, self.db_name)) as db:
+        with self._open() as db:
             return db.get(key)
 
+    @storage_op("shelve", "delete")
     def delete(self, key: str):
-        with shelve.open(os.path.join(self.db_path, self.db_name)) as db:
+        with self._open() as db:
             if key in db:
                 del db[key]
 
+    @storage_op("shelve", "list_keys")
     def list_keys(self):
-        with shelve.open(os.path.join(self.db_path, self.db_name)) as db:
+        with self._open() as db:
             return list(db.keys())
         
+    @storage_op("shelve", "read_all")
     def read_all(self):
-        with shelve.open(os.path.join(self.db_path, self.db_name)) as db:
-            return dict(db)
\ No newline at end of file
+        with self._open() as db:
+            return dict(db)
+
+    def _read_page(self, keys: List[str]) -> Iterable[Tuple[str, Any]]:
+        # Shelve has no ordered scan: keys are sorted in memory, values are
+        # read one page per open so memory stays bounded by the page size.
+        with self._open(flag="r") as db:
+            return [(key, db[key]) for key in keys if key in db]
+
+
+class SQLiteDB(BaseDB):
+    """Key-value store on SQLite in WAL mode.
+
+    Each thread keeps its own connection (sqlite3 connections must not be
+    shared across threads) and reuses it, so statements stay in the
+    connection's prepared statement cache. Values are pickled like shelve does.
+    """
+
+    _UPSERT = (
+        "INSERT INTO records (key, value, updated_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at"
+    )
+
+    def __init__(self, db_name: str):
+        super().__init__(db_name)
+        self.file_path = os.path.join(self.db_path, f"{db_name}.sqlite3")
+        self._local = threading.local()
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.file_path, timeout=30, cached_statements=64)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def write(self, key: str, value: Any):
+        self.write_many([(key, value)])
+
+    @storage_op("sqlite", "write_many")
+    def write_many(self, items: Iterable[Tuple[str, Any]]):
+        now = time.time()
+        rows = [(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now) for key, value in items]
+        with self._connection() as connection:
+            connection.executemany(self._UPSERT, rows)
+
+    @storage_op("sqlite", "read")
+    def read(self, key: str) -> Any:
+        row = self._connection().execute("SELECT value FROM records WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+
+    @storage_op("sqlite", "delete")
+    def delete(self, key: str):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM records WHERE key = ?", (key,))
+
+    @storage_op("sqlite", "list_keys")
+    def list_keys(self) -> List[str]:
+        return [row[0] for row in self._connection().execute("SELECT key FROM records ORDER BY key")]
+
+    @storage_op("sqlite", "read_all")
+    def read_all(self) -> Dict[str, Any]:
+        rows = self._connection().execute("SELECT key, value FROM records ORDER BY key")
+        return {key: pickle.loads(value) for key, value in rows}
+
+    def iter_items(
+        self,
+        cursor: Optional[str] = None,
+        prefix: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        page_size: int = 500,
+    ) -> Iterator[Record]:
+        conditions, params = ["key > ?"], [cursor or ""]
+        if prefix:
+            conditions.append("key >= ? AND key < ?")
+            params += [prefix, prefix + "\U0010ffff"]
+        if since is not None:
+            conditions.append("updated_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("updated_at < ?")
+            params.append(until)
+        query = f"SELECT key, value, updated_at FROM records WHERE {' AND '.join(conditions)} ORDER BY key LIMIT ?"
+
+        while True:
+            rows = self._connection().execute(query, (*params, page_size)).fetchall()
+            for key, value, updated_at in rows:
+                yield key, pickle.loads(value), updated_at
+            if len(rows) < page_size:
+                return
+            params[0] = rows[-1][0]
+
+
+STORAGE_BACKENDS = {
+    "shelve": ShelveDB,
+    "sqlite": SQLiteDB,
+}
+
+
+def get_db(db_name: str, backend: str = "shelve") -> BaseDB:
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}, expected one of {sorted(STORAGE_BACKENDS)}")
+    return STORAGE_BACKENDS[backend](db_name)
@@ -1,17 +1,73 @@
-from fastapi import Request
+import hmac
+from fastapi import Request, HTTPException
 from backend.src import services
+from backend.src import config
 
 def get_predict_credit_service(request: Request) -> services.PredictCreditService:
-    return services.PredictCreditService(model=request.app.state.classifier)
+    return services.PredictCreditService(
+        models=request.app.state.models,
+        executor=request.app.state.inference_executor,
+        batcher=request.app.state.predict_batcher,
+        cache=request.app.state.result_cache,
+        monitor=request.app.state.monitor,
+    )
 
 def get_explain_results_service(request: Request) -> services.ExplainResultsService:
-    return services.ExplainResultsService(model=request.app.state.classifier)
+    return services.ExplainResultsService(
+        models=request.app.state.models,
+        executor=request.app.state.explain_executor,
+        batcher=request.app.state.explain_batcher,
+        cache=request.app.state.result_cache,
+        monitor=request.app.state.monitor,
+        fallback_executor=request.app.state.inference_executor,
+    )
+
+def get_counterfactual_service(request: Request) -> services.CounterfactualService:
+    return services.CounterfactualService(
+        models=request.app.state.models,
+        executor=request.app.state.inference_executor,
+        grid=request.app.state.counterfactual_grid,
+    )
 
 def get_user_data_service(request: Request) -> services.UserDataService:
-    return services.UserDataService(db=request.app.state.user_data_db)
+    return services.UserDataService(
+        db=request.app.state.user_data_db,
+        executor=request.app.state.storage_executor,
+        writer=request.app.state.write_behind,
+    )
 
 def get_credit_application_service(request: Request) -> services.CreditApplicationService:
-    return services.CreditApplicationService(db=request.app.state.credit_application_db)
+    return services.CreditApplicationService(
+        db=request.app.state.credit_application_db,
+        executor=request.app.state.storage_executor,
+        writer=request.app.state.write_behind,
+    )
 
 def get_report_model_service(request: Request) -> services.ReportModelService:
-    return services.ReportModelService(db=request.app.state.model_report_db)
+    return services.ReportModelService(
+        db=request.app.state.model_report_db,
+        executor=request.app.state.storage_executor,
+        writer=request.app.state.write_behind,
+    )
+
+def get_score_service(request: Request) -> services.ScoreService:
+    return services.ScoreService(
+        models=request.app.state.models,
+        executor=request.app.state.explain_executor,
+        user_data_service=get_user_data_service(request),
+        cache=request.app.state.result_cache,
+        monitor=request.app.state.monitor,
+    )
+
+def require_admin_token(request: Request):
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin routes are disabled")
+    token = request.headers.get(config.ADMIN_TOKEN_HEADER, "")
+    if not hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail=f"Missing or invalid {config.ADMIN_TOKEN_HEADER}")
+
+def get_export_service(store: str, request: Request) -> services.ExportService:
+    db = getattr(request.app.state, f"{store}_db", None)
+    if db is None:
+        raise HTTPException(status_code=404, detail=f"Unknown store {store}")
+    return services.ExportService(db=db, page_size=config.EXPORT_PAGE_SIZE)
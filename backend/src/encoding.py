@@ -0,0 +1,95 @@
+"""Vectorized encoding of applicant tables into model feature matrices.
+
+Raw tables use the columns of `application_record.csv` (category strings,
+DAYS_BIRTH / DAYS_EMPLOYED); encoded tables already use the
+PredictionRequest field names with codes or label_encoders.json labels. Both produce matrices in
+FEATURE_COLUMNS order, the same layout as `preprocess_input`.
+"""
+import typing as tp
+import numpy as np
+import pandas as pd
+from backend.src import config
+from backend.src.features import FEATURE_COLUMNS, FEATURE_SPECS, FeatureRegistry, FeatureSpec
+
+LABEL_ENCODERS_PATH = config.LABEL_ENCODERS_PATH
+
+# feature -> (raw column, label_encoders.json key); the key is None for numeric columns.
+RAW_COLUMNS = {name: (raw_column, encoder) for name, _, raw_column, encoder in FEATURE_SPECS}
+
+# Same binning as the training notebook: 18-22, 23-29, then five-year groups.
+AGE_BINS = [18, 23, *range(30, 100, 5)]
+AGE_LABELS = [f"{AGE_BINS[i]}-{AGE_BINS[i + 1] - 1}" for i in range(len(AGE_BINS) - 1)]
+
+
+def detect_format(columns: tp.Iterable[str]) -> str:
+    columns = set(columns)
+    if "DAYS_BIRTH" in columns:
+        return "raw"
+    if set(FEATURE_COLUMNS) <= columns:
+        return "encoded"
+    raise ValueError("Input has neither raw application_record columns nor encoded feature columns")
+
+
+def age_labels(days_birth: pd.Series) -> pd.Series:
+    age = -pd.to_numeric(days_birth, errors="coerce") // 365
+    return pd.cut(age, bins=AGE_BINS, labels=AGE_LABELS, right=False).astype(object)
+
+
+def employment_labels(days_employed: pd.Series) -> pd.Series:
+    years = np.trunc(-pd.to_numeric(days_employed, errors="coerce") / 365)
+    labels = np.select([years <= 0, years <= 3, years <= 10], ["0", "1-3", "4-10"], default="10+")
+    return pd.Series(labels, index=days_employed.index).where(years.notna())
+
+
+def encode_raw(frame: pd.DataFrame, registry: FeatureRegistry) -> tp.Tuple[np.ndarray, tp.List[tp.Optional[str]]]:
+    """Encodes raw application records; rows that cannot be encoded get an error message."""
+    features = np.zeros((len(frame), len(FEATURE_COLUMNS)), dtype=np.int64)
+    invalid = np.zeros(len(frame), dtype=bool)
+    reasons = np.full(len(frame), None, dtype=object)
+
+    for i, column in enumerate(FEATURE_COLUMNS):
+        spec = registry[column]
+        raw_column = spec.raw_column
+        values = frame[raw_column]
+        if column == "age_group":
+            values = age_labels(values)
+        elif column == "years_employed_cat":
+            values = employment_labels(values)
+
+        if spec.encoder is None:
+            encoded = pd.to_numeric(values, errors="coerce")
+        else:
+            encoded = values.map(spec.labels)
+        missing = encoded.isna().to_numpy()
+        reasons[missing & ~invalid] = f"invalid {raw_column}"
+        invalid |= missing
+        features[:, i] = encoded.fillna(0).to_numpy(dtype=np.float64).astype(np.int64)
+
+    return features, reasons.tolist()
+
+
+def encode_series(spec: FeatureSpec, values: pd.Series) -> pd.Series:
+    """Vectorized FeatureSpec.encode for a column: codes and numeric strings pass through, labels are mapped."""
+    numeric = pd.to_numeric(values, errors="coerce")
+    if not spec.labels or pd.api.types.is_numeric_dtype(values):
+        return numeric
+    return numeric.fillna(values.map(spec.labels))
+
+
+def encode_features(frame: pd.DataFrame, registry: FeatureRegistry) -> tp.Tuple[np.ndarray, tp.List[tp.Optional[str]]]:
+    """Validates feature columns holding codes, booleans or label_encoders.json labels."""
+    features = np.zeros((len(frame), len(FEATURE_COLUMNS)), dtype=np.int64)
+    invalid = np.zeros(len(frame), dtype=bool)
+    reasons = np.full(len(frame), None, dtype=object)
+
+    for i, column in enumerate(FEATURE_COLUMNS):
+        values = frame[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.replace({"true": 1, "false": 0, "True": 1, "False": 0})
+        encoded = encode_series(registry[column], values)
+        missing = encoded.isna().to_numpy()
+        reasons[missing & ~invalid] = f"invalid {column}"
+        invalid |= missing
+        features[:, i] = encoded.fillna(0).to_numpy(dtype=np.float64).astype(np.int64)
+
+    return features, reasons.tolist()
@@ -0,0 +1,26 @@
+import asyncio
+import functools
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from backend.src import profiling
+
+
+class BoundedExecutor:
+    """Runs blocking calls on a dedicated thread pool, keeping at most
+    `max_concurrency` of them in flight; further callers wait on the event loop."""
+
+    def __init__(self, name: str, max_workers: int, max_concurrency: tp.Optional[int] = None):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._semaphore = asyncio.Semaphore(max_concurrency or max_workers)
+
+    async def run(self, fn: tp.Callable[..., tp.Any], *args, **kwargs) -> tp.Any:
+        profile = profiling.current()
+        if profile is not None:
+            fn = functools.partial(profile.run_in_thread, fn)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
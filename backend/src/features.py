@@ -0,0 +1,108 @@
+"""Single description of the model's input features.
+
+The registry fixes the column order of every feature matrix, the dtype each
+request field is validated as, and the label <-> code mappings from
+label_encoders.json, so the API, bulk scoring, training and the frontend all
+encode categories the same way.
+"""
+import functools
+import hashlib
+import itertools
+import json
+import operator
+import typing as tp
+import numpy as np
+from backend.src import config
+
+# (feature, dtype, raw application_record.csv column, label_encoders.json key), in model column order.
+FEATURE_SPECS = (
+    ("flag_own_car", "bool", "FLAG_OWN_CAR", "FLAG_OWN_CAR"),
+    ("flag_own_realty", "bool", "FLAG_OWN_REALTY", "FLAG_OWN_REALTY"),
+    ("cnt_children", "int", "CNT_CHILDREN", None),
+    ("amt_income_total", "int", "AMT_INCOME_TOTAL", None),
+    ("code_income_type", "category", "NAME_INCOME_TYPE", "CODE_INCOME_TYPE"),
+    ("code_education_type", "category", "NAME_EDUCATION_TYPE", "CODE_EDUCATION_TYPE"),
+    ("code_family_status", "category", "NAME_FAMILY_STATUS", "CODE_FAMILY_STATUS"),
+    ("code_housing_type", "category", "NAME_HOUSING_TYPE", "CODE_HOUSING_TYPE"),
+    ("age_group", "category", "DAYS_BIRTH", "age_group"),
+    ("years_employed_cat", "category", "DAYS_EMPLOYED", "years_employed_cat"),
+    ("code_occupation_type", "category", "OCCUPATION_TYPE", "CODE_OCCUPATION_TYPE"),
+    ("cnt_family_members", "int", "CNT_FAM_MEMBERS", None),
+)
+FEATURE_COLUMNS = tuple(name for name, *_ in FEATURE_SPECS)
+
+
+class FeatureSpec:
+    def __init__(self, name: str, dtype: str, raw_column: str, encoder: tp.Optional[str], labels: tp.Dict[str, int]):
+        self.name = name
+        self.dtype = dtype
+        self.raw_column = raw_column
+        self.encoder = encoder
+        # label -> code; empty for numeric features.
+        self.labels = labels
+        self.codes = {code: label for label, code in labels.items()}
+
+    def encode(self, value: tp.Any) -> tp.Any:
+        """Maps a raw label to its code; anything else is left for pydantic to validate."""
+        if not isinstance(value, str) or not self.labels:
+            return value
+        code = self.labels.get(value)
+        if code is not None:
+            return code
+        if self.dtype == "category" and not value.strip().lstrip("-").isdigit():
+            raise ValueError(f"Unknown {self.name} label {value!r}, expected one of {sorted(self.labels)}")
+        return value
+
+    def describe(self) -> dict:
+        return {"name": self.name, "dtype": self.dtype, "labels": {str(code): label for code, label in sorted(self.codes.items())}}
+
+
+class FeatureRegistry:
+    def __init__(self, encoders: tp.Dict[str, tp.Dict[str, int]]):
+        self.specs = tuple(
+            FeatureSpec(name, dtype, raw_column, encoder, encoders.get(encoder, {}) if encoder else {})
+            for name, dtype, raw_column, encoder in FEATURE_SPECS
+        )
+        self.by_name = {spec.name: spec for spec in self.specs}
+        self.columns = FEATURE_COLUMNS
+        self._row_values = operator.attrgetter(*self.columns)
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureRegistry":
+        return cls(load_label_encoders(path))
+
+    def __getitem__(self, name: str) -> FeatureSpec:
+        return self.by_name[name]
+
+    def index(self, name: str) -> int:
+        return self.columns.index(name)
+
+    def encode_fields(self, values: tp.Dict[str, tp.Any]) -> tp.Dict[str, tp.Any]:
+        """Replaces raw labels in a request body with codes."""
+        return {name: self.by_name[name].encode(value) if name in self.by_name else value for name, value in values.items()}
+
+    def matrix(self, rows: tp.Sequence[tp.Any]) -> np.ndarray:
+        """(N, F) matrix of validated requests, filled in one pass into a buffer sized up front."""
+        values = itertools.chain.from_iterable(map(self._row_values, rows))
+        return np.fromiter(values, dtype=np.int64, count=len(rows) * len(self.columns)).reshape(len(rows), len(self.columns))
+
+    def describe(self) -> tp.List[dict]:
+        return [spec.describe() for spec in self.specs]
+
+    @functools.cached_property
+    def schema_hash(self) -> bytes:
+        """8 bytes identifying column order, dtypes and encodings; packed clients must send it back."""
+        return hashlib.sha256(json.dumps(self.describe(), sort_keys=True).encode()).digest()[:8]
+
+
+def load_label_encoders(path: str = config.LABEL_ENCODERS_PATH) -> tp.Dict[str, tp.Dict[str, int]]:
+    """Returns label -> code per encoder (the JSON file stores code -> label)."""
+    with open(path) as f:
+        encoders = json.load(f)
+    return {name: {label: int(code) for code, label in mapping.items()} for name, mapping in encoders.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def feature_registry() -> FeatureRegistry:
+    """The process-wide registry; loaded during app startup, or on first use in CLIs."""
+    return FeatureRegistry.load(config.LABEL_ENCODERS_PATH)
@@ -1,34 +1,156 @@
 from fastapi import APIRouter, Form, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import typing as tp
 from backend.src import services
 from backend.src import dependencies
 from backend.src import schemas
+from backend.src.write_behind import WriteQueueFull
+from backend.src.process_stats import worker_report
+from backend.src import config
+from backend.src import packed
+from backend.src.admission import AdmissionRoute
+from backend.src.metrics import REGISTRY
 
-router = APIRouter(tags=["Model"])
+router = APIRouter(tags=["Model"], route_class=AdmissionRoute)
+admin_router = APIRouter(
+    prefix="/admin", tags=["Admin"], dependencies=[Depends(dependencies.require_admin_token)]
+)
+health_router = APIRouter(tags=["Health"])
 
 @router.post("/predict", response_model=schemas.PredictionResponse)
 async def predict_credit_approve(
     request: schemas.PredictionRequest,
+    response: Response,
     predict_service: services.PredictCreditService = Depends(dependencies.get_predict_credit_service),
 ) -> schemas.PredictionResponse:
     try:
-        pred, proba = predict_service.predict(request)
-        return schemas.PredictionResponse(pred=pred, proba=proba)
+        pred, proba, model_version = await predict_service.predict(request)
+        response.headers["X-Model-Version"] = model_version
+        return schemas.PredictionResponse(pred=pred, proba=proba, model_version=model_version)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@router.post("/predict_batch", response_model=schemas.BatchPredictionResponse)
+async def predict_credit_approve_batch(
+    request: schemas.BatchPredictionRequest,
+    response: Response,
+    predict_service: services.PredictCreditService = Depends(dependencies.get_predict_credit_service),
+) -> schemas.BatchPredictionResponse:
+    try:
+        results, model_version = await predict_service.predict_batch(request.items)
+        response.headers["X-Model-Version"] = model_version
+        return schemas.BatchPredictionResponse(results=results, model_version=model_version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/explain", response_model=schemas.FeatureExplainLevels)
 async def predict_credit_approve(
     request: schemas.PredictionRequest,
+    response: Response,
+    fastapi_request: Request,
     explain_service: services.ExplainResultsService = Depends(dependencies.get_explain_results_service)
 ) -> schemas.FeatureExplainLevels:
+    # Set by AdmissionRoute when the explain gate is full; answer cheaply instead of queueing.
+    overload = getattr(fastapi_request.state, "admission_overload", None)
     try:
-        importance_levels = explain_service.explain_prediction(request)
+        if overload is not None:
+            importance_levels, model_version, source = await explain_service.explain_degraded(request)
+            response.headers["X-Explanation"] = source
+        else:
+            importance_levels, model_version = await explain_service.explain_prediction(request)
+        response.headers["X-Model-Version"] = model_version
         return schemas.FeatureExplainLevels(**importance_levels)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@router.post("/explain_batch", response_model=schemas.BatchExplainResponse)
+async def explain_batch(
+    request: schemas.BatchPredictionRequest,
+    response: Response,
+    explain_service: services.ExplainResultsService = Depends(dependencies.get_explain_results_service)
+) -> schemas.BatchExplainResponse:
+    try:
+        results, model_version = await explain_service.explain_batch(request.items)
+        response.headers["X-Model-Version"] = model_version
+        return schemas.BatchExplainResponse(results=results, model_version=model_version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/counterfactuals", response_model=schemas.CounterfactualResponse)
+async def counterfactuals(
+    request: schemas.CounterfactualRequest,
+    response: Response,
+    counterfactual_service: services.CounterfactualService = Depends(dependencies.get_counterfactual_service),
+) -> schemas.CounterfactualResponse:
+    try:
+        result = await counterfactual_service.counterfactuals(request)
+        response.headers["X-Model-Version"] = result.model_version
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/features")
+async def features(request: Request, response: Response):
+    """Feature order, dtypes and code -> label mappings; request fields accept either form."""
+    response.headers["X-Feature-Schema"] = request.app.state.features.schema_hash.hex()
+    return request.app.state.features.describe()
+
+
+@router.post("/predict_packed", response_class=Response)
+async def predict_packed(
+    request: Request,
+    predict_service: services.PredictCreditService = Depends(dependencies.get_predict_credit_service),
+) -> Response:
+    """Pre-encoded rows in, approval probabilities out; see backend/src/packed.py for the layout."""
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if media_type not in (packed.PACKED_MEDIA_TYPE, packed.ARROW_MEDIA_TYPE):
+        raise HTTPException(
+            status_code=415, detail=f"Expected {packed.PACKED_MEDIA_TYPE} or {packed.ARROW_MEDIA_TYPE}"
+        )
+    registry = request.app.state.features
+    body = await request.body()
+    try:
+        if media_type == packed.ARROW_MEDIA_TYPE:
+            features = packed.decode_arrow_rows(body, registry.schema_hash, len(registry.columns), config.PACKED_MAX_ROWS)
+        else:
+            features = packed.decode_rows(body, registry.schema_hash, len(registry.columns), config.PACKED_MAX_ROWS)
+    except packed.PackedFormatError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    try:
+        probabilities, model_version = await predict_service.predict_matrix(features)
+        if media_type == packed.ARROW_MEDIA_TYPE:
+            content = packed.encode_arrow_probabilities(probabilities, registry.schema_hash)
+        else:
+            content = packed.encode_probabilities(probabilities, registry.schema_hash)
+        return Response(content=content, media_type=media_type, headers={"X-Model-Version": model_version})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/score", response_model=schemas.ScoreResponse)
+async def score(
+    request: schemas.ScoreRequest,
+    response: Response,
+    score_service: services.ScoreService = Depends(dependencies.get_score_service),
+) -> schemas.ScoreResponse:
+    try:
+        result = await score_service.score(request)
+        response.headers["X-Model-Version"] = result.model_version
+        if result.store_error is not None:
+            response.headers["Warning"] = '199 - "Application data was not stored, retry storing it later"'
+        response.set_cookie(key="store_data", value=str(request.store_data).lower(), httponly=True, secure=False, samesite="None")
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/store_user_data")
 async def store_user_data(
     request: schemas.PredictionRequest,
@@ -39,10 +161,12 @@ async def store_user_data(
         store_data = fastapi_request.cookies.get("store_data", "false").lower() == "true"
         print("store", fastapi_request.cookies.get("store_data"))
         if store_data:
-            user_data_service.store_data(request)
+            await user_data_service.store_data(request)
             return {"message": "Data stored"}
         else:
             return {"message": "Data is not stored due to settings"}
+    except WriteQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -53,8 +177,10 @@ async def create_application(
     credit_application_service: services.CreditApplicationService = Depends(dependencies.get_credit_application_service)
 ):
     try:
-        credit_application_service.create_application(request)
+        await credit_application_service.create_application(request)
         return {"message": "Application created"}
+    except WriteQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -65,8 +191,10 @@ async def report_model(
     report_model_service: services.ReportModelService = Depends(dependencies.get_report_model_service)
 ):
     try:
-        report_model_service.report_model(request)
+        await report_model_service.report_model(request)
         return {"message": "Report created"}
+    except WriteQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -74,4 +202,166 @@ async def report_model(
 @router.post("/update_settings")
 async def update_settings(store_data: bool, response: Response):
     response.set_cookie(key="store_data", value=str(store_data).lower(), httponly=True, secure=False, samesite="None")
-    return {"message": "Settings updated successfully", "store_data": store_data}
\ No newline at end of file
+    return {"message": "Settings updated successfully", "store_data": store_data}
+
+
+@admin_router.get("/batching")
+async def batching_stats(fastapi_request: Request):
+    batchers = (fastapi_request.app.state.predict_batcher, fastapi_request.app.state.explain_batcher)
+    return {batcher.name: batcher.stats() for batcher in batchers if batcher is not None}
+
+
+@admin_router.get("/cache")
+async def cache_stats(fastapi_request: Request):
+    cache = fastapi_request.app.state.result_cache
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@admin_router.get("/admission")
+async def admission_stats(fastapi_request: Request):
+    admission = fastapi_request.app.state.admission
+    return admission.stats() if admission is not None else {"enabled": False}
+
+
+@admin_router.get("/monitoring")
+async def monitoring(fastapi_request: Request, window_s: tp.Optional[float] = None):
+    monitor = fastapi_request.app.state.monitor
+    return monitor.snapshot(window_s) if monitor is not None else {"enabled": False}
+
+
+@admin_router.get("/write_behind")
+async def write_behind_stats(fastapi_request: Request):
+    writer = fastapi_request.app.state.write_behind
+    return writer.stats() if writer is not None else {"enabled": False}
+
+
+@admin_router.get("/record_log")
+async def record_log_stats(fastapi_request: Request):
+    state = fastapi_request.app.state
+    return {
+        db.db_name: db.stats()
+        for db in (state.credit_application_db, state.model_report_db)
+        if hasattr(db, "stats")
+    }
+
+
+
+# Records stream in key order; to resume an interrupted export pass the last
+# received key as `cursor`. Records hold applicant data; like every admin route this needs ADMIN_TOKEN.
+@admin_router.get("/export/{store}")
+async def export_store(
+    format: str = "ndjson",
+    cursor: tp.Optional[str] = None,
+    prefix: tp.Optional[str] = None,
+    since: tp.Optional[float] = None,
+    until: tp.Optional[float] = None,
+    export_service: services.ExportService = Depends(dependencies.get_export_service),
+):
+    if format not in services.ExportService.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format {format}")
+    if format == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+
+    chunks = export_service.stream(format, cursor, prefix, since, until)
+    try:
+        first = await run_in_threadpool(next, chunks, b"")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def body():
+        yield first
+        yield from chunks
+
+    return StreamingResponse(body(), media_type=services.ExportService.FORMATS[format])
+
+
+
+@admin_router.get("/worker")
+async def worker_stats(fastapi_request: Request):
+    state = fastapi_request.app.state
+    return worker_report(state.startup.report(state.models.current.load_times))
+
+
+@admin_router.get("/startup")
+async def startup_report(fastapi_request: Request):
+    state = fastapi_request.app.state
+    return state.startup.report(state.models.current.load_times)
+
+
+@admin_router.get("/models")
+async def list_models(fastapi_request: Request):
+    models = fastapi_request.app.state.models
+    versions = await run_in_threadpool(models.registry.versions)
+    return {**models.status(), "versions": versions}
+
+
+@admin_router.post("/models/activate")
+async def activate_model(request: schemas.ModelActivation, fastapi_request: Request):
+    models = fastapi_request.app.state.models
+    try:
+        # Persist first so other workers follow through the registry watcher.
+        await run_in_threadpool(models.registry.activate, request.name)
+        await models.activate(request.name)
+        return models.status()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.post("/models/shadow")
+async def start_shadow(request: schemas.ShadowSettings, fastapi_request: Request):
+    models = fastapi_request.app.state.models
+    try:
+        await models.set_shadow(request.name, request.sample_rate)
+        return models.status()
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.delete("/models/shadow")
+async def stop_shadow(fastapi_request: Request):
+    models = fastapi_request.app.state.models
+    models.clear_shadow()
+    return models.status()
+
+
+@admin_router.get("/profiles")
+async def list_profiles(fastapi_request: Request):
+    store = fastapi_request.app.state.profile_store
+    if store is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return await run_in_threadpool(store.list)
+
+
+@admin_router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, fastapi_request: Request):
+    store = fastapi_request.app.state.profile_store
+    path = store.path(profile_id) if store is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=path.rsplit("/", 1)[-1], media_type="application/octet-stream")
+
+
+@health_router.get("/healthz")
+async def liveness():
+    return {"status": "alive"}
+
+
+@health_router.get("/readyz")
+async def readiness(fastapi_request: Request, response: Response):
+    state = fastapi_request.app.state
+    ready = getattr(state, "ready", False) and (state.warmed_up or not config.READINESS_REQUIRES_WARMUP)
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "warmed_up": getattr(state, "warmed_up", False)}
+
+
+@health_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,80 @@
+import contextvars
+import functools
+import inspect
+import time
+import typing as tp
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from backend.src.metrics import REGISTRY
+
+# perf_counter() marks set by the endpoint wrapper for the request being handled.
+_endpoint_marks: contextvars.ContextVar[tp.Dict[str, float]] = contextvars.ContextVar("endpoint_marks")
+
+
+def _mark_endpoint(endpoint: tp.Callable) -> tp.Callable:
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        marks = _endpoint_marks.get(None)
+        if marks is not None:
+            marks["entered"] = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if marks is not None:
+                marks["returned"] = time.perf_counter()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that splits request latency into stages.
+
+    `validate` covers body parsing, Pydantic validation and dependencies,
+    `handler` the endpoint itself, and `serialize` the response model
+    validation and JSON encoding that FastAPI does after the endpoint returns.
+    """
+
+    def __init__(self, path: str, endpoint: tp.Callable, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _mark_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def wrap_handler(self, handler: tp.Callable) -> tp.Callable:
+        """Hook for subclasses to run code around the handler, inside the timing."""
+        return handler
+
+    def get_route_handler(self) -> tp.Callable:
+        handler = self.wrap_handler(super().get_route_handler())
+        route = self.path
+
+        async def timed_handler(request):
+            marks = {}
+            token = _endpoint_marks.set(marks)
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            except RequestValidationError:
+                status = 422
+                raise
+            finally:
+                finished = time.perf_counter()
+                _endpoint_marks.reset(token)
+                entered = marks.get("entered", finished)
+                returned = marks.get("returned", finished)
+                REGISTRY.histogram("http_request_stage_seconds", route=route, stage="validate").observe(entered - started)
+                if "entered" in marks:
+                    REGISTRY.histogram("http_request_stage_seconds", route=route, stage="handler").observe(returned - entered)
+                    REGISTRY.histogram("http_request_stage_seconds", route=route, stage="serialize").observe(finished - returned)
+                REGISTRY.histogram("http_request_duration_seconds", route=route).observe(finished - started)
+                REGISTRY.counter(
+                    "http_requests_total", route=route, method=request.method, status=str(status)
+                ).inc()
+
+        return timed_handler
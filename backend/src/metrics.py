@@ -0,0 +1,168 @@
+import bisect
+import contextlib
+import functools
+import threading
+import time
+import typing as tp
+
+Labels = tp.Tuple[tp.Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    def __init__(self, name: str, buckets: tp.Sequence[float], labels: Labels = ()):
+        self.name = name
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = count
+
+        return {"buckets": buckets, "sum": total, "count": count}
+
+
+class Counter:
+    def __init__(self, name: str, labels: Labels = ()):
+        self.name = name
+        self.labels = labels
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+def _format_labels(labels: Labels, extra: tp.Optional[tp.Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    """Process-wide set of named, labelled metrics rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._histograms: tp.Dict[tp.Tuple[str, Labels], Histogram] = {}
+        self._counters: tp.Dict[tp.Tuple[str, Labels], Counter] = {}
+        self._help: tp.Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, buckets: tp.Sequence[float] = LATENCY_BUCKETS, description: str = "", **labels: str) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(name, buckets, key[1]))
+                self._help.setdefault(name, description)
+        return histogram
+
+    def counter(self, name: str, description: str = "", **labels: str) -> Counter:
+        key = (name, tuple(sorted(labels.items())))
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter(name, key[1]))
+                self._help.setdefault(name, description)
+        return counter
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels: str):
+        histogram = self.histogram(name, **labels)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = sorted(self._histograms.values(), key=lambda h: (h.name, h.labels))
+            counters = sorted(self._counters.values(), key=lambda c: (c.name, c.labels))
+
+        lines, declared = [], set()
+
+        def declare(name: str, kind: str):
+            if name not in declared:
+                declared.add(name)
+                if self._help.get(name):
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for counter in counters:
+            declare(counter.name, "counter")
+            lines.append(f"{counter.name}{_format_labels(counter.labels)} {_format_value(counter.value)}")
+
+        for histogram in histograms:
+            declare(histogram.name, "histogram")
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                lines.append(f"{histogram.name}_bucket{_format_labels(histogram.labels, ('le', bound))} {count}")
+            lines.append(f"{histogram.name}_sum{_format_labels(histogram.labels)} {_format_value(snapshot['sum'])}")
+            lines.append(f"{histogram.name}_count{_format_labels(histogram.labels)} {snapshot['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def stage_timer(stage: str):
+    """Time one stage of the request path (preprocessing, model call, bucketing, ...)."""
+    return REGISTRY.timer("stage_duration_seconds", stage=stage)
+
+
+def count(name: str, amount: float = 1.0, **labels: str):
+    REGISTRY.counter(name, **labels).inc(amount)
+
+
+def storage_op(backend: str, op: str):
+    """Decorator timing and counting a storage backend method."""
+    histogram = REGISTRY.histogram("storage_op_duration_seconds", backend=backend, op=op)
+    errors = REGISTRY.counter("storage_op_errors_total", backend=backend, op=op)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,40 @@
+"""Import existing shelve stores from backend/src/db into another storage backend.
+
+Usage: python -m backend.src.migrate_shelve [--backend sqlite] [--batch-size 500] [name ...]
+"""
+import argparse
+import itertools
+import os
+import shelve
+from backend.src.db import DB_DIR, get_db
+
+DEFAULT_STORES = ("user_data", "credit_application", "model_report")
+
+
+def migrate(db_name: str, backend: str, batch_size: int) -> int:
+    target = get_db(db_name, backend)
+    migrated = 0
+    with shelve.open(os.path.join(DB_DIR, db_name), flag="r") as source:
+        keys = iter(source.keys())
+        while True:
+            chunk = list(itertools.islice(keys, batch_size))
+            if not chunk:
+                break
+            target.write_many((key, source[key]) for key in chunk)
+            migrated += len(chunk)
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="*", default=DEFAULT_STORES)
+    parser.add_argument("--backend", default="sqlite")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    for name in args.names:
+        print(f"{name}: migrated {migrate(name, args.backend, args.batch_size)} records to {args.backend}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import asyncio
+import random
+import typing as tp
+import numpy as np
+from model.registry import ModelRegistry
+from model.xgboost_classifier import XGBoostModel
+from backend.src.executors import BoundedExecutor
+from backend.src.metrics import count
+
+
+class ShadowStats:
+    def __init__(self, name: str, sample_rate: float):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.rows = 0
+        self.disagreements = 0
+        self.probability_diff_sum = 0.0
+        self.skipped = 0
+        self.errors = 0
+
+    def record(self, primary: tp.List[dict], candidate: tp.List[dict]):
+        for ours, theirs in zip(primary, candidate):
+            self.rows += 1
+            self.disagreements += ours["prediction"] != theirs["prediction"]
+            self.probability_diff_sum += abs(ours["probability"] - theirs["probability"])
+
+    def snapshot(self) -> dict:
+        return {
+            "candidate": self.name,
+            "sample_rate": self.sample_rate,
+            "rows": self.rows,
+            "disagreements": self.disagreements,
+            "disagreement_rate": self.disagreements / self.rows if self.rows else None,
+            "mean_abs_probability_diff": self.probability_diff_sum / self.rows if self.rows else None,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+
+class ModelManager:
+    """Holds the model being served and swaps it without a restart.
+
+    Requests read `current` once when they start, so a swap only affects
+    requests that arrive afterwards; in-flight ones finish on the model they
+    started with. A new version is fully loaded and warmed up on `executor`
+    before it becomes visible.
+    """
+
+    def __init__(
+        self,
+        current: XGBoostModel,
+        registry: ModelRegistry,
+        load_model: tp.Callable[[str, tp.Optional[str]], XGBoostModel],
+        executor: BoundedExecutor,
+        current_name: tp.Optional[str] = None,
+        shadow_max_in_flight: int = 4,
+    ):
+        self.current = current
+        self.current_name = current_name
+        self.registry = registry
+        self._load_model = load_model
+        self._executor = executor
+        self._swap_lock = asyncio.Lock()
+        self.swaps = 0
+        self._on_activate: tp.List[tp.Callable[[XGBoostModel], None]] = []
+
+        self.shadow: tp.Optional[XGBoostModel] = None
+        self.shadow_stats: tp.Optional[ShadowStats] = None
+        self._shadow_max_in_flight = shadow_max_in_flight
+        self._shadow_tasks: tp.Set[asyncio.Task] = set()
+
+    def _load(self, name: str) -> XGBoostModel:
+        model = self._load_model(self.registry.model_path(name), self.registry.shared_path(name))
+        model.warm_up()
+        return model
+
+    async def activate(self, name: str):
+        async with self._swap_lock:
+            if name == self.current_name:
+                return
+            model = await self._executor.run(self._load, name)
+            previous = self.current
+            self.current, self.current_name = model, name
+            self.swaps += 1
+            for callback in self._on_activate:
+                callback(model)
+            if previous is not model and previous is not self.shadow:
+                XGBoostModel.release(previous.model_path)
+            print(f"Serving model {name} (version {model.version})")
+
+    def on_activate(self, callback: tp.Callable[[XGBoostModel], None]):
+        """Calls `callback` with the new model right after every swap."""
+        self._on_activate.append(callback)
+
+    async def watch(self, interval_s: float):
+        """Follows the registry's ACTIVE pointer, so every worker converges on it."""
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                name = await self._executor.run(self.registry.active)
+                if name is not None and name != self.current_name:
+                    await self.activate(name)
+            except Exception as e:
+                print(str(e))
+
+    async def set_shadow(self, name: str, sample_rate: float):
+        model = await self._executor.run(self._load, name)
+        previous = self.shadow
+        self.shadow, self.shadow_stats = model, ShadowStats(name, sample_rate)
+        self._release_shadow(previous)
+
+    def clear_shadow(self):
+        previous, self.shadow = self.shadow, None
+        self._release_shadow(previous)
+
+    def _release_shadow(self, previous: tp.Optional[XGBoostModel]):
+        # `activate` keeps a replaced model that is still the shadow; it is released here once it is neither.
+        if previous is not None and previous is not self.current and previous is not self.shadow:
+            XGBoostModel.release(previous.model_path)
+
+    # Micro-batcher entry points: report which model produced each row.
+    def predict_rows(self, features: np.ndarray) -> tp.List[tp.Tuple[dict, str]]:
+        model = self.current
+        return [(result, model.version) for result in model.predict_batch(features)]
+
+    def explain_rows(self, features: np.ndarray) -> tp.List[tp.Tuple[tp.Dict[str, int], str]]:
+        model = self.current
+        return [(levels, model.version) for levels in model.get_importance_values_batch(features)]
+
+    def maybe_shadow(self, features: np.ndarray, primary: tp.List[dict]):
+        """Scores a sampled fraction of traffic on the shadow model in the background."""
+        shadow, stats = self.shadow, self.shadow_stats
+        if shadow is None or random.random() >= stats.sample_rate:
+            return
+        if len(self._shadow_tasks) >= self._shadow_max_in_flight:
+            stats.skipped += 1
+            return
+        task = asyncio.create_task(self._run_shadow(shadow, stats, features, primary))
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+
+    async def _run_shadow(self, shadow: XGBoostModel, stats: ShadowStats, features: np.ndarray, primary: tp.List[dict]):
+        try:
+            candidate = await self._executor.run(shadow.predict_batch, features)
+            stats.record(primary, candidate)
+            count("shadow_rows_total", len(candidate), candidate=stats.name)
+        except Exception as e:
+            stats.errors += 1
+            print(str(e))
+
+    def status(self) -> dict:
+        return {
+            "current": {"name": self.current_name, "model_version": self.current.version, "path": self.current.model_path},
+            "swaps": self.swaps,
+            "shadow": self.shadow_stats.snapshot() if self.shadow is not None else None,
+        }
+
+
+class ModelVersionMiddleware:
+    """Adds X-Model-Version to responses that did not set it themselves."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_version(message):
+            if message["type"] == "http.response.start":
+                models = getattr(scope["app"].state, "models", None)
+                headers = message.setdefault("headers", [])
+                if models is not None and not any(name == b"x-model-version" for name, _ in headers):
+                    message["headers"] = [*headers, (b"x-model-version", models.current.version.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_version)
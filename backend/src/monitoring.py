@@ -0,0 +1,336 @@
+"""Constant-memory monitoring of model inputs and outputs, with drift against a reference.
+
+Every request adds its rows to the current time window:
+- counts per category for categorical and small integer features;
+- a log-bucketed quantile sketch for income, with relative error MONITORING_INCOME_ACCURACY;
+- a histogram of approval probabilities and counts of explanation levels.
+
+Each window is a few fixed-size NumPy arrays, and only the last N windows are kept. Recording a row is a handful
+of vectorized NumPy operations on the event loop, so it costs microseconds. Queries merge the windows they cover
+and compare them with a reference profile of the training data using the population stability index (PSI).
+
+Build a reference from a training file with:
+    python -m backend.src.monitoring model/data/application_record.csv [--model model/xgboost_model.json]
+"""
+import argparse
+import json
+import math
+import operator
+import os
+import time
+import typing as tp
+import numpy as np
+from backend.src.features import FeatureRegistry
+
+INCOME_FEATURE = "amt_income_total"
+# Small integer features are counted per value; larger values share the last bin.
+SMALL_INT_BINS = 11
+INCOME_MAX = 1e9
+PROBABILITY_BINS = 20
+LEVELS = (-2, -1, 0, 1, 2)
+# Shares below this are floored when computing PSI, so empty bins do not blow it up.
+PSI_EPSILON = 1e-4
+
+
+class Layout:
+    """Bin layout shared by live windows and the reference profile."""
+
+    def __init__(self, registry: FeatureRegistry, income_accuracy: float):
+        self.registry = registry
+        self.count_features = tuple(name for name in registry.columns if name != INCOME_FEATURE)
+        self.count_columns = np.array([registry.index(name) for name in self.count_features])
+        self.income_column = registry.index(INCOME_FEATURE)
+
+        # One extra "other" bin per feature for values outside the known domain.
+        sizes = np.array([
+            (max(registry[name].codes) + 1 if registry[name].codes else SMALL_INT_BINS) + 1
+            for name in self.count_features
+        ])
+        self.count_sizes = sizes
+        self.count_limits = sizes - 1
+        self.count_offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.count_bins = int(sizes.sum())
+
+        self.income_accuracy = income_accuracy
+        self.gamma = (1 + income_accuracy) / (1 - income_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.income_bins = int(math.ceil(math.log(INCOME_MAX) / self._log_gamma)) + 1
+
+        self.level_offsets = np.arange(len(registry.columns)) * len(LEVELS) - LEVELS[0]
+        self.level_bins = len(registry.columns) * len(LEVELS)
+        self.level_values = operator.itemgetter(*registry.columns)
+
+    def count_indices(self, features: np.ndarray) -> np.ndarray:
+        values = features[:, self.count_columns]
+        values = np.where((values >= 0) & (values < self.count_limits), values, self.count_limits)
+        return (values + self.count_offsets).ravel()
+
+    def income_indices(self, income: np.ndarray) -> np.ndarray:
+        # Bucket i holds (gamma^(i-1), gamma^i]; incomes below 1 go to bucket 0.
+        clipped = np.clip(income.astype(np.float64), 1.0, INCOME_MAX)
+        return np.ceil(np.log(clipped) / self._log_gamma).astype(np.int64)
+
+    def income_value(self, index: int) -> float:
+        """Representative value of a bucket, within `income_accuracy` of every value in it."""
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+
+class Window:
+    def __init__(self, layout: Layout, started: float = 0.0):
+        self.started = started
+        self.rows = 0
+        self.explained_rows = 0
+        self.counts = np.zeros(layout.count_bins, dtype=np.int64)
+        self.income = np.zeros(layout.income_bins, dtype=np.int64)
+        self.probability = np.zeros(PROBABILITY_BINS, dtype=np.int64)
+        self.levels = np.zeros(layout.level_bins, dtype=np.int64)
+
+    def reset(self, started: float):
+        self.started = started
+        self.rows = self.explained_rows = 0
+        for array in (self.counts, self.income, self.probability, self.levels):
+            array.fill(0)
+
+    def merge(self, other: "Window"):
+        self.rows += other.rows
+        self.explained_rows += other.explained_rows
+        self.counts += other.counts
+        self.income += other.income
+        self.probability += other.probability
+        self.levels += other.levels
+
+    def add_rows(self, layout: Layout, features: np.ndarray, probabilities: tp.Optional[np.ndarray]):
+        self.rows += len(features)
+        np.add.at(self.counts, layout.count_indices(features), 1)
+        np.add.at(self.income, layout.income_indices(features[:, layout.income_column]), 1)
+        if probabilities is not None:
+            bins = np.minimum((np.asarray(probabilities) * PROBABILITY_BINS).astype(np.int64), PROBABILITY_BINS - 1)
+            np.add.at(self.probability, bins, 1)
+
+    def add_levels(self, layout: Layout, levels: np.ndarray):
+        self.explained_rows += len(levels)
+        np.add.at(self.levels, (levels + layout.level_offsets).ravel(), 1)
+
+    def to_dict(self, layout: Layout) -> dict:
+        registry = layout.registry
+        counts = {
+            name: self.counts[offset:offset + size].tolist()
+            for name, offset, size in zip(layout.count_features, layout.count_offsets, layout.count_sizes)
+        }
+        levels = self.levels.reshape(len(registry.columns), len(LEVELS))
+        return {
+            "rows": self.rows,
+            "explained_rows": self.explained_rows,
+            "counts": counts,
+            "income": {str(i): int(n) for i, n in enumerate(self.income) if n},
+            "probability": self.probability.tolist(),
+            "levels": {name: row.tolist() for name, row in zip(registry.columns, levels)},
+        }
+
+    @classmethod
+    def from_dict(cls, layout: Layout, data: dict) -> "Window":
+        window = cls(layout)
+        window.rows = data["rows"]
+        window.explained_rows = data["explained_rows"]
+        for name, offset, size in zip(layout.count_features, layout.count_offsets, layout.count_sizes):
+            window.counts[offset:offset + size] = data["counts"][name]
+        for index, n in data["income"].items():
+            window.income[int(index)] = n
+        window.probability[:] = data["probability"]
+        window.levels[:] = np.concatenate([data["levels"][name] for name in layout.registry.columns])
+        return window
+
+
+def _shares(counts: np.ndarray) -> np.ndarray:
+    total = counts.sum(axis=-1, keepdims=True)
+    return counts / np.maximum(total, 1)
+
+
+def psi(actual: np.ndarray, expected: np.ndarray) -> tp.Optional[float]:
+    if actual.sum() == 0 or expected.sum() == 0:
+        return None
+    a = np.maximum(_shares(actual), PSI_EPSILON)
+    e = np.maximum(_shares(expected), PSI_EPSILON)
+    return float(((a - e) * np.log(a / e)).sum())
+
+
+def quantiles(layout: Layout, income: np.ndarray, qs: tp.Sequence[float]) -> tp.Dict[str, tp.Optional[float]]:
+    total = income.sum()
+    if total == 0:
+        return {f"p{int(q * 100)}": None for q in qs}
+    cumulative = np.cumsum(income)
+    indices = np.searchsorted(cumulative, np.asarray(qs) * total, side="left")
+    return {f"p{int(q * 100)}": round(layout.income_value(int(i)), 2) for q, i in zip(qs, indices)}
+
+
+class FeatureMonitor:
+    """Rolling windows of sketches. Not thread-safe: record from the event loop only."""
+
+    def __init__(
+        self,
+        registry: FeatureRegistry,
+        window_s: float,
+        windows: int,
+        income_accuracy: float = 0.01,
+        reference_path: tp.Optional[str] = None,
+        psi_alert: float = 0.2,
+    ):
+        self.layout = Layout(registry, income_accuracy)
+        self.window_s = window_s
+        self.psi_alert = psi_alert
+        self._windows = [Window(self.layout) for _ in range(windows)]
+        self._epochs = [-1] * windows
+        self.reference = self._load_reference(reference_path) if reference_path else None
+
+    def _load_reference(self, path: str) -> tp.Optional[Window]:
+        if not os.path.exists(path):
+            print(f"No monitoring reference profile at {path}")
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("feature_schema") != self.layout.registry.schema_hash.hex():
+            print(f"Monitoring reference {path} was built for a different feature schema; ignoring it")
+            return None
+        if data.get("income_accuracy") != self.layout.income_accuracy:
+            print(f"Monitoring reference {path} uses a different income sketch accuracy; ignoring it")
+            return None
+        return Window.from_dict(self.layout, data["profile"])
+
+    def _current(self) -> Window:
+        now = time.time()
+        epoch = int(now // self.window_s)
+        slot = epoch % len(self._windows)
+        if self._epochs[slot] != epoch:
+            self._windows[slot].reset(epoch * self.window_s)
+            self._epochs[slot] = epoch
+        return self._windows[slot]
+
+    def record(self, features: np.ndarray, probabilities: tp.Optional[tp.Sequence[float]] = None):
+        self._current().add_rows(self.layout, features, probabilities)
+
+    def record_levels(self, levels: tp.Sequence[tp.Dict[str, int]]):
+        self._current().add_levels(self.layout, level_matrix(self.layout, levels))
+
+    def merged(self, window_s: tp.Optional[float] = None) -> Window:
+        """Sum of the windows that started within the last `window_s` seconds (all kept windows by default)."""
+        self._current()
+        oldest = time.time() - (window_s if window_s is not None else self.window_s * len(self._windows))
+        merged = Window(self.layout)
+        for window, epoch in zip(self._windows, self._epochs):
+            if epoch >= 0 and window.started + self.window_s > oldest:
+                merged.merge(window)
+        return merged
+
+    def snapshot(self, window_s: tp.Optional[float] = None) -> dict:
+        layout, registry = self.layout, self.layout.registry
+        live = self.merged(window_s)
+        reference = self.reference
+
+        features = {}
+        for name, offset, size in zip(layout.count_features, layout.count_offsets, layout.count_sizes):
+            counts = live.counts[offset:offset + size]
+            labels = [registry[name].codes.get(code, str(code)) for code in range(size - 1)] + ["other"]
+            features[name] = {
+                "distribution": {str(label): round(float(share), 4) for label, share in zip(labels, _shares(counts)) if share},
+                "psi": psi(counts, reference.counts[offset:offset + size]) if reference else None,
+            }
+        features[INCOME_FEATURE] = {
+            "quantiles": quantiles(layout, live.income, (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)),
+            "reference_quantiles": quantiles(layout, reference.income, (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)) if reference else None,
+            "psi": self._income_psi(live.income, reference.income) if reference else None,
+        }
+
+        live_levels = live.levels.reshape(len(registry.columns), len(LEVELS))
+        reference_levels = reference.levels.reshape(len(registry.columns), len(LEVELS)) if reference else None
+        levels = {
+            name: {
+                "distribution": dict(zip(map(str, LEVELS), np.round(_shares(live_levels[i]), 4).tolist())),
+                "psi": psi(live_levels[i], reference_levels[i]) if reference else None,
+            }
+            for i, name in enumerate(registry.columns)
+        }
+
+        probability = {
+            "histogram": live.probability.tolist(),
+            "bin_width": 1 / PROBABILITY_BINS,
+            "psi": psi(live.probability, reference.probability) if reference else None,
+        }
+        drift = {name: stats["psi"] for name, stats in features.items()}
+        drift["probability"] = probability["psi"]
+        drift.update({f"levels.{name}": stats["psi"] for name, stats in levels.items()})
+        return {
+            "window_s": window_s if window_s is not None else self.window_s * len(self._windows),
+            "rows": live.rows,
+            "explained_rows": live.explained_rows,
+            "reference_rows": reference.rows if reference else None,
+            "features": features,
+            "probability": probability,
+            "explanation_levels": levels,
+            "alerts": sorted(name for name, value in drift.items() if value is not None and value > self.psi_alert),
+        }
+
+    def _income_psi(self, live: np.ndarray, reference: np.ndarray) -> tp.Optional[float]:
+        """PSI over the reference deciles; the raw sketch buckets are too fine to compare directly."""
+        total = reference.sum()
+        if total == 0:
+            return None
+        edges = np.unique(np.searchsorted(np.cumsum(reference), np.arange(1, 10) / 10 * total, side="left"))
+        bounds = np.concatenate([[0], edges + 1, [len(reference)]])
+        return psi(np.add.reduceat(live, bounds[:-1]), np.add.reduceat(reference, bounds[:-1]))
+
+
+def reference_profile(layout: Layout, window: Window, **meta) -> dict:
+    """Serializable reference built from a window filled with training rows."""
+    return {
+        "feature_schema": layout.registry.schema_hash.hex(),
+        "income_accuracy": layout.income_accuracy,
+        "created_at": time.time(),
+        **meta,
+        "profile": window.to_dict(layout),
+    }
+
+
+def level_matrix(layout: Layout, levels: tp.Sequence[tp.Dict[str, int]]) -> np.ndarray:
+    return np.array([layout.level_values(row) for row in levels], dtype=np.int64).reshape(len(levels), -1)
+
+
+def main():
+    from backend.src.bulk_score import encode_chunk, read_chunks
+    from backend.src import config
+    from model.xgboost_classifier import XGBoostModel
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSONL of raw application records or encoded features")
+    parser.add_argument("--model", default=config.MODEL_PATH)
+    parser.add_argument("--encoders", default=config.LABEL_ENCODERS_PATH)
+    parser.add_argument("--output", default=config.MONITORING_REFERENCE_PATH)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument(
+        "--explain-rows", type=int, default=2_000,
+        help="Rows explained for the level profile; explanations run at roughly 30ms per row",
+    )
+    args = parser.parse_args()
+
+    registry = FeatureRegistry.load(args.encoders)
+    model = XGBoostModel(model_path=args.model)
+    layout = Layout(registry, config.MONITORING_INCOME_ACCURACY)
+    window = Window(layout)
+    for frame in read_chunks(args.input, args.chunk_size, 0):
+        features, errors, _ = encode_chunk(frame, registry)
+        features = features[np.array([error is None for error in errors], dtype=bool)]
+        if not len(features):
+            continue
+        window.add_rows(layout, features, model.approval_probabilities(features))
+        explain = min(len(features), args.explain_rows - window.explained_rows)
+        if explain > 0:
+            window.add_levels(layout, level_matrix(layout, model.get_importance_values_batch(features[:explain])))
+        print(f"{window.rows} rows profiled")
+
+    reference = reference_profile(layout, window, model_version=model.version, source=os.path.abspath(args.input))
+    with open(args.output, "w") as f:
+        json.dump(reference, f)
+    print(f"Reference profile of {window.rows} rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
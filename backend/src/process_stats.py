@@ -0,0 +1,25 @@
+import os
+import resource
+import typing as tp
+
+PROC_STATUS_FIELDS = ("VmRSS", "RssAnon", "RssFile", "RssShmem")
+
+
+def memory_usage() -> tp.Dict[str, int]:
+    """Current resident memory in bytes. RssFile covers file-backed pages such
+    as the mapped model, which are shared with other workers."""
+    usage = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in PROC_STATUS_FIELDS:
+                    usage[name] = int(value.split()[0]) * 1024
+    except FileNotFoundError:
+        # ru_maxrss is the peak, in kilobytes on Linux and bytes on macOS.
+        usage["MaxRSS"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage
+
+
+def worker_report(startup: dict) -> dict:
+    return {"pid": os.getpid(), "memory_bytes": memory_usage(), "startup": startup}
@@ -0,0 +1,220 @@
+import asyncio
+import contextvars
+import cProfile
+import collections
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import typing as tp
+import uuid
+from starlette.datastructures import MutableHeaders
+
+PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+_active: contextvars.ContextVar[tp.Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+
+
+def current() -> tp.Optional["RequestProfile"]:
+    return _active.get()
+
+
+class ProfileStore:
+    """Bounded on-disk ring of profiles: the oldest are deleted beyond `max_profiles`."""
+
+    EXTENSIONS = {"cprofile": "prof", "sampling": "txt"}
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _ids(self) -> tp.List[str]:
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def save(self, profile_id: str, mode: str, data: bytes, metadata: dict):
+        with open(os.path.join(self.directory, f"{profile_id}.{self.EXTENSIONS[mode]}"), "wb") as f:
+            f.write(data)
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as f:
+            json.dump({"id": profile_id, "mode": mode, **metadata}, f)
+
+        with self._lock:
+            ids = self._ids()
+            for stale in ids[:max(len(ids) - self.max_profiles, 0)]:
+                for name in os.listdir(self.directory):
+                    if name.startswith(f"{stale}."):
+                        os.remove(os.path.join(self.directory, name))
+
+    def list(self) -> tp.List[dict]:
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, profile_id: str) -> tp.Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        for extension in self.EXTENSIONS.values():
+            path = os.path.join(self.directory, f"{profile_id}.{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+
+class RequestProfile:
+    """Profile of one request: the event loop thread while it is in flight,
+    plus every call it hands to a BoundedExecutor.
+
+    Coroutines of other requests running on the loop at the same time show up
+    in the loop-thread part; executor work is attributed to this request only.
+    """
+
+    def __init__(self, mode: str, interval_ms: float):
+        self.id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self._interval = interval_ms / 1000
+        self._profiles: tp.List[cProfile.Profile] = []
+        self._threads: tp.Set[int] = set()
+        self._stacks: tp.Counter[str] = collections.Counter()
+        self._stopped = threading.Event()
+        self._sampler: tp.Optional[threading.Thread] = None
+
+    def start(self):
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            self._profiles.append(profile)
+            profile.enable()
+        else:
+            self._threads.add(threading.get_ident())
+            self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        if self.mode == "cprofile":
+            self._profiles[0].disable()
+        else:
+            self._stopped.set()
+            self._sampler.join()
+
+    def run_in_thread(self, fn: tp.Callable, *args, **kwargs):
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            self._profiles.append(profile)
+            return profile.runcall(fn, *args, **kwargs)
+
+        ident = threading.get_ident()
+        self._threads.add(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._threads.discard(ident)
+
+    def _sample(self):
+        while not self._stopped.wait(self._interval):
+            frames = sys._current_frames()
+            for ident in list(self._threads):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    self._stacks[";".join(reversed(stack))] += 1
+
+    def dump(self) -> bytes:
+        if self.mode == "cprofile":
+            stats = pstats.Stats(self._profiles[0], stream=io.StringIO())
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            # Same layout as Stats.dump_stats, so the file opens with pstats / snakeviz.
+            return marshal.dumps(stats.stats)
+        # Collapsed stacks, the input format of flamegraph.pl and speedscope.
+        return "".join(f"{stack} {samples}\n" for stack, samples in self._stacks.most_common()).encode()
+
+
+class ProfilingMiddleware:
+    """Profiles requests that carry `header` (matching `token` when one is set)
+    or that are picked at `sample_rate`.
+
+    Only one request is profiled at a time: cProfile cannot be enabled twice
+    on the same thread, and overlapping samples would blur attribution.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        mode: str = "cprofile",
+        header: str = "x-profile",
+        token: str = "",
+        sample_rate: float = 0.0,
+        interval_ms: float = 5.0,
+    ):
+        if mode not in ProfileStore.EXTENSIONS:
+            raise ValueError(f"Unknown profiling mode {mode!r}, expected one of {sorted(ProfileStore.EXTENSIONS)}")
+        self.app = app
+        self._store = store
+        self._mode = mode
+        self._header = header.lower().encode()
+        self._token = token.encode()
+        self._sample_rate = sample_rate
+        self._interval_ms = interval_ms
+        self._busy = False
+
+    def _triggered(self, scope) -> tp.Optional[str]:
+        for name, value in scope["headers"]:
+            if name == self._header and value not in (b"", b"0", b"false"):
+                if not self._token or value == self._token:
+                    return "header"
+        if self._sample_rate > 0 and random.random() < self._sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._triggered(scope) if scope["type"] == "http" and not self._busy else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        profile = RequestProfile(self._mode, self._interval_ms)
+        response_status = {}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                response_status["status"] = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile.id)
+            await send(message)
+
+        token = _active.set(profile)
+        started = time.perf_counter()
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            duration = time.perf_counter() - started
+            _active.reset(token)
+            self._busy = False
+            metadata = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": response_status.get("status"),
+                "trigger": trigger,
+                "duration_ms": duration * 1000,
+                "created_at": time.time(),
+            }
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._store.save, profile.id, self._mode, profile.dump(), metadata)
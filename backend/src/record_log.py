@@ -0,0 +1,278 @@
+import asyncio
+import fcntl
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+import typing as tp
+from backend.src.db import BaseDB, Record, filter_keys
+from backend.src.executors import BoundedExecutor
+from backend.src.metrics import storage_op
+
+# crc32(key + value), value length, timestamp, key length
+HEADER = struct.Struct("<IIdH")
+SEGMENT_SUFFIX = ".seg"
+TOMBSTONE = b""
+COMPACTED_KEY = "__compacted__"
+LOCK_FILE = "LOCK"
+
+
+class Entry(tp.NamedTuple):
+    segment: int
+    offset: int
+    timestamp: float
+    deleted: bool
+
+
+class RecordLogDB(BaseDB):
+    """Append-only, segmented record log implementing the BaseDB interface.
+
+    Every write appends `header | key | pickled value` to the active segment, so
+    all versions of a key are kept; `read` returns the latest one and `history`
+    all of them. The in-memory index maps keys to record offsets and is rebuilt
+    on open by reading headers and keys only. Sealed segments are immutable
+    until `compact` merges them, dropping deleted keys and, if `max_versions`
+    is set, versions older than the newest `max_versions`.
+
+    The index and append offsets live in this process, so a log has a single
+    writer: opening it takes an exclusive lock on the directory, and a second
+    process (e.g. another server worker) fails to open it instead of
+    appending at stale offsets. Run EVENT_STORE=log with one worker.
+    """
+
+    def __init__(self, db_name: str, segment_max_bytes: int = 64 * 1024 * 1024, max_versions: int = 0):
+        super().__init__(db_name)
+        self.log_path = os.path.join(self.db_path, f"{db_name}.log")
+        os.makedirs(self.log_path, exist_ok=True)
+        self._lock_file = open(os.path.join(self.log_path, LOCK_FILE), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(
+                f"Record log {self.log_path} is open in another process; it supports a single writer, "
+                "so run EVENT_STORE=log with one worker"
+            )
+        self._segment_max_bytes = segment_max_bytes
+        self._max_versions = max_versions
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._index: tp.Dict[str, tp.List[Entry]] = {}
+
+        for name in os.listdir(self.log_path):
+            if name.endswith(".compacting"):
+                os.remove(os.path.join(self.log_path, name))
+
+        segments = self._segment_ids()
+        for segment in segments:
+            if os.path.exists(self._segment_file(segment)):
+                self._load_segment(segment, verify=segment == segments[-1])
+
+        self._active = max(self._segment_ids(), default=0) or 1
+        self._file = open(self._segment_file(self._active), "ab")
+
+    def _segment_file(self, segment: int) -> str:
+        return os.path.join(self.log_path, f"{segment:08d}{SEGMENT_SUFFIX}")
+
+    def _segment_ids(self) -> tp.List[int]:
+        return sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.log_path)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _load_segment(self, segment: int, verify: bool):
+        path = self._segment_file(segment)
+        valid_until = 0
+        with open(path, "rb") as f:
+            while True:
+                offset = f.tell()
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                crc, value_len, timestamp, key_len = HEADER.unpack(header)
+                key_bytes = f.read(key_len)
+                if verify:
+                    value = f.read(value_len)
+                    if len(value) < value_len or zlib.crc32(key_bytes + value) != crc:
+                        break
+                else:
+                    f.seek(value_len, os.SEEK_CUR)
+                valid_until = f.tell()
+
+                key = key_bytes.decode("utf-8")
+                if key == COMPACTED_KEY:
+                    # Finish a compaction interrupted before the merged segments were removed.
+                    for superseded in self._read_value(segment, offset):
+                        if superseded != segment and os.path.exists(self._segment_file(superseded)):
+                            os.remove(self._segment_file(superseded))
+                    continue
+                self._index.setdefault(key, []).append(Entry(segment, offset, timestamp, value_len == 0))
+
+        if verify and valid_until < os.path.getsize(path):
+            # Drop a torn tail left by a crash mid-append.
+            with open(path, "r+b") as f:
+                f.truncate(valid_until)
+
+    def _read_record(self, segment: int, offset: int) -> tp.Tuple[bytes, bytes, float]:
+        with open(self._segment_file(segment), "rb") as f:
+            f.seek(offset)
+            _, value_len, timestamp, key_len = HEADER.unpack(f.read(HEADER.size))
+            key = f.read(key_len)
+            return key, f.read(value_len), timestamp
+
+    def _read_value(self, segment: int, offset: int) -> tp.Any:
+        _, value, _ = self._read_record(segment, offset)
+        return pickle.loads(value) if value != TOMBSTONE else None
+
+    @staticmethod
+    def _encode(key: str, value: bytes, timestamp: float) -> bytes:
+        key_bytes = key.encode("utf-8")
+        return HEADER.pack(zlib.crc32(key_bytes + value), len(value), timestamp, len(key_bytes)) + key_bytes + value
+
+    def _append(self, records: tp.List[tp.Tuple[str, bytes]]):
+        now = time.time()
+        with self._lock:
+            if self._file.tell() >= self._segment_max_bytes:
+                self._file.close()
+                self._active += 1
+                self._file = open(self._segment_file(self._active), "ab")
+
+            offset = self._file.tell()
+            chunks = []
+            for key, value in records:
+                record = self._encode(key, value, now)
+                self._index.setdefault(key, []).append(Entry(self._active, offset, now, value == TOMBSTONE))
+                offset += len(record)
+                chunks.append(record)
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+
+    def write(self, key: str, value: tp.Any):
+        self.write_many([(key, value)])
+
+    @storage_op("record_log", "write_many")
+    def write_many(self, items: tp.Iterable[tp.Tuple[str, tp.Any]]):
+        self._append([(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) for key, value in items])
+
+    # Reads hold the lock so compaction cannot replace a segment mid-read.
+    @storage_op("record_log", "read")
+    def read(self, key: str) -> tp.Any:
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries or entries[-1].deleted:
+                return None
+            return self._read_value(entries[-1].segment, entries[-1].offset)
+
+    def history(self, key: str) -> tp.List[tp.Tuple[float, tp.Any]]:
+        with self._lock:
+            return [
+                (entry.timestamp, self._read_value(entry.segment, entry.offset))
+                for entry in self._index.get(key, [])
+                if not entry.deleted
+            ]
+
+    @storage_op("record_log", "delete")
+    def delete(self, key: str):
+        if key in self._index:
+            self._append([(key, TOMBSTONE)])
+
+    def list_keys(self) -> tp.List[str]:
+        with self._lock:
+            return [key for key, entries in self._index.items() if not entries[-1].deleted]
+
+    def read_all(self) -> tp.Dict[str, tp.Any]:
+        return {key: self.read(key) for key in self.list_keys()}
+
+    def iter_items(
+        self,
+        cursor: tp.Optional[str] = None,
+        prefix: tp.Optional[str] = None,
+        since: tp.Optional[float] = None,
+        until: tp.Optional[float] = None,
+        page_size: int = 500,
+    ) -> tp.Iterator[Record]:
+        for key in filter_keys(self.list_keys(), cursor, prefix):
+            with self._lock:
+                entries = self._index.get(key)
+                if not entries or entries[-1].deleted:
+                    continue
+                latest = entries[-1]
+                if (since is not None and latest.timestamp < since) or (until is not None and latest.timestamp >= until):
+                    continue
+                value = self._read_value(latest.segment, latest.offset)
+            yield key, value, latest.timestamp
+
+    def compact(self) -> int:
+        """Merges all sealed segments into one; returns the number of records dropped."""
+        with self._compaction_lock:
+            with self._lock:
+                sealed = [segment for segment in self._segment_ids() if segment < self._active]
+                snapshot = {key: list(entries) for key, entries in self._index.items()}
+            if not sealed:
+                return 0
+
+            sealed_set = set(sealed)
+            keep = []
+            for key, entries in snapshot.items():
+                if entries[-1].deleted:
+                    continue
+                retained = entries[-self._max_versions:] if self._max_versions else entries
+                keep.extend(entry for entry in retained if entry.segment in sealed_set and not entry.deleted)
+            keep.sort(key=lambda entry: (entry.segment, entry.offset))
+
+            target = sealed[0]
+            tmp_path = self._segment_file(target) + ".compacting"
+            moved: tp.Dict[tp.Tuple[int, int], Entry] = {}
+            with open(tmp_path, "wb") as out:
+                out.write(self._encode(COMPACTED_KEY, pickle.dumps(sealed), time.time()))
+                for entry in keep:
+                    key, value, timestamp = self._read_record(entry.segment, entry.offset)
+                    moved[(entry.segment, entry.offset)] = Entry(target, out.tell(), timestamp, False)
+                    out.write(HEADER.pack(zlib.crc32(key + value), len(value), timestamp, len(key)) + key + value)
+                out.flush()
+                os.fsync(out.fileno())
+
+            with self._lock:
+                os.replace(tmp_path, self._segment_file(target))
+                for key in list(self._index):
+                    entries = [
+                        moved.get((entry.segment, entry.offset), entry)
+                        for entry in self._index[key]
+                        if entry.segment not in sealed_set or (entry.segment, entry.offset) in moved
+                    ]
+                    if entries:
+                        self._index[key] = entries
+                    else:
+                        del self._index[key]
+                for segment in sealed[1:]:
+                    os.remove(self._segment_file(segment))
+
+            return sum(entry.segment in sealed_set for entries in snapshot.values() for entry in entries) - len(keep)
+
+    def stats(self) -> dict:
+        with self._lock:
+            segments = self._segment_ids()
+            return {
+                "segments": len(segments),
+                "bytes": sum(os.path.getsize(self._segment_file(segment)) for segment in segments),
+                "keys": len(self._index),
+                "records": sum(len(entries) for entries in self._index.values()),
+            }
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._lock_file.close()
+
+
+async def run_compaction(logs: tp.Sequence[RecordLogDB], executor: BoundedExecutor, interval_s: float):
+    while True:
+        await asyncio.sleep(interval_s)
+        for log in logs:
+            try:
+                await executor.run(log.compact)
+            except Exception as e:
+                print(str(e))
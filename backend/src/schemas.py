@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 import typing as tp
+from backend.src.features import feature_registry
 
 
 class User(BaseModel):
@@ -22,6 +23,14 @@ class PredictionRequest(BaseModel):
     code_housing_type: int
     code_occupation_type: int
 
+    @model_validator(mode="before")
+    @classmethod
+    def encode_labels(cls, data: tp.Any) -> tp.Any:
+        """Categorical fields accept either codes or label_encoders.json labels ("Working", "30-34")."""
+        if isinstance(data, dict):
+            return feature_registry().encode_fields(data)
+        return data
+
 
 class FeatureExplainLevels(BaseModel):
     age_group: int
@@ -41,6 +50,58 @@ class FeatureExplainLevels(BaseModel):
 class PredictionResponse(BaseModel):
     pred: int
     proba: float
+    model_version: tp.Optional[str] = None
+
+
+class ScoreRequest(PredictionRequest):
+    store_data: bool = False
+
+
+class ScoreResponse(BaseModel):
+    pred: int
+    proba: float
+    explanation: FeatureExplainLevels
+    stored: bool
+    # Why the application was not stored although store_data was requested.
+    store_error: tp.Optional[str] = None
+    model_version: tp.Optional[str] = None
+
+
+class BatchPredictionRequest(BaseModel):
+    items: tp.List[tp.Dict[str, tp.Any]]
+
+
+class BatchPredictionItem(BaseModel):
+    index: int
+    pred: tp.Optional[int] = None
+    proba: tp.Optional[float] = None
+    error: tp.Optional[str] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    results: tp.List[BatchPredictionItem]
+    model_version: tp.Optional[str] = None
+
+
+class CounterfactualRequest(PredictionRequest):
+    max_changes: int = Field(2, ge=1, le=2)
+    limit: tp.Optional[int] = Field(None, ge=1)
+
+
+class Counterfactual(BaseModel):
+    changes: tp.Dict[str, int]
+    pred: int
+    proba: float
+    cost: float
+
+
+class CounterfactualResponse(BaseModel):
+    pred: int
+    proba: float
+    counterfactuals: tp.List[Counterfactual]
+    candidates_scored: int
+    budget_exhausted: bool
+    model_version: tp.Optional[str] = None
 
 
 class CreditApplication(BaseModel):
@@ -52,4 +113,23 @@ class ModelReport(BaseModel):
     user: User
     issue_type: str
     text: str
-    
\ No newline at end of file
+    
+
+class BatchExplainItem(BaseModel):
+    index: int
+    levels: tp.Optional[FeatureExplainLevels] = None
+    error: tp.Optional[str] = None
+
+
+class BatchExplainResponse(BaseModel):
+    results: tp.List[BatchExplainItem]
+    model_version: tp.Optional[str] = None
+
+
+class ModelActivation(BaseModel):
+    name: str
+
+
+class ShadowSettings(BaseModel):
+    name: str
+    sample_rate: float = 0.1
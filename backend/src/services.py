@@ -1,64 +1,363 @@
-from model.xgboost_classifier import XGBoostModel
-from backend.src.utils import preprocess_input, hash_user_key
-from backend.src.db import ShelveDB
+from pydantic import ValidationError
+import typing as tp
+import csv
+import io
+import json
+import numpy as np
+from backend.src.utils import preprocess_input, preprocess_batch, hash_user_key
+from backend.src.db import BaseDB
 from backend.src import schemas
+from backend.src import config
+from backend.src.batching import MicroBatcher
+from backend.src.executors import BoundedExecutor
+from backend.src.cache import ResultCache, feature_key
+from backend.src.write_behind import WriteBehindQueue, WriteQueueFull
+from backend.src.metrics import stage_timer, count
+from backend.src.model_manager import ModelManager
+from backend.src.monitoring import FeatureMonitor
+from backend.src import counterfactuals
+
+def validate_batch(
+    items: tp.List[tp.Dict[str, tp.Any]],
+    results: tp.List[tp.Union[schemas.BatchPredictionItem, schemas.BatchExplainItem]],
+) -> tp.Tuple[tp.List[schemas.PredictionRequest], tp.List[int]]:
+    valid_rows, valid_indices = [], []
+    for i, item in enumerate(items):
+        if i >= config.PREDICT_BATCH_MAX_SIZE:
+            results[i].error = f"Batch size limit of {config.PREDICT_BATCH_MAX_SIZE} exceeded"
+            continue
+        try:
+            valid_rows.append(schemas.PredictionRequest.model_validate(item))
+            valid_indices.append(i)
+        except ValidationError as e:
+            results[i].error = str(e)
+
+    return valid_rows, valid_indices
+
 
 class PredictCreditService:
-    def __init__(self, model: XGBoostModel):
-        self._classifier = model
+    def __init__(
+        self,
+        models: ModelManager,
+        executor: BoundedExecutor,
+        batcher: tp.Optional[MicroBatcher] = None,
+        cache: tp.Optional[ResultCache] = None,
+        monitor: tp.Optional[FeatureMonitor] = None,
+    ):
+        self._models = models
+        self._classifier = models.current
+        self._executor = executor
+        self._batcher = batcher
+        self._cache = cache
+        self._monitor = monitor
+
+    async def predict(self, data: schemas.PredictionRequest) -> tp.Tuple[int, float, str]:
+        with stage_timer("preprocess"):
+            preprocessed_data = preprocess_input(data)
+        key = feature_key("predict", preprocessed_data)
+        version = self._classifier.version
+        prediction = self._cache.get(key, version) if self._cache is not None else None
+
+        if prediction is None:
+            with stage_timer("predict"):
+                if self._batcher is not None:
+                    prediction, version = await self._batcher.submit(preprocessed_data[0])
+                else:
+                    prediction = await self._executor.run(self._classifier.predict, preprocessed_data)
+            if self._cache is not None:
+                self._cache.put(key, version, prediction)
+            self._models.maybe_shadow(preprocessed_data, [prediction])
+        if self._monitor is not None:
+            self._monitor.record(preprocessed_data, (prediction['probability'],))
+
+        return prediction['prediction'], prediction['probability'], version
 
-    def predict(self, data: schemas.PredictionRequest):
-        preprocessed_data = preprocess_input(data)
-        prediction = self._classifier.predict(preprocessed_data)
-        return prediction['prediction'], prediction['probability']
+    async def predict_batch(
+        self, items: tp.List[tp.Dict[str, tp.Any]]
+    ) -> tp.Tuple[tp.List[schemas.BatchPredictionItem], str]:
+        results = [schemas.BatchPredictionItem(index=i) for i in range(len(items))]
+        valid_rows, valid_indices = validate_batch(items, results)
+
+        if valid_rows:
+            with stage_timer("preprocess_batch"):
+                features = preprocess_batch(valid_rows)
+            with stage_timer("predict_batch"):
+                predictions = await self._executor.run(self._classifier.predict_batch, features)
+            self._models.maybe_shadow(features, predictions)
+            if self._monitor is not None:
+                self._monitor.record(features, [prediction['probability'] for prediction in predictions])
+            for i, prediction in zip(valid_indices, predictions):
+                results[i].pred = prediction['prediction']
+                results[i].proba = prediction['probability']
+
+        return results, self._classifier.version
+
+    async def predict_matrix(self, features: np.ndarray) -> tp.Tuple[np.ndarray, str]:
+        """Approval probabilities for pre-encoded rows, skipping per-row validation and dicts."""
+        with stage_timer("predict_matrix"):
+            probabilities = await self._executor.run(self._classifier.approval_probabilities, features)
+        if self._monitor is not None:
+            self._monitor.record(features, probabilities)
+        return probabilities, self._classifier.version
 
 
 class ExplainResultsService:
-    def __init__(self, model: XGBoostModel):
-        self._classifier = model
+    def __init__(
+        self,
+        models: ModelManager,
+        executor: BoundedExecutor,
+        batcher: tp.Optional[MicroBatcher] = None,
+        cache: tp.Optional[ResultCache] = None,
+        monitor: tp.Optional[FeatureMonitor] = None,
+        fallback_executor: tp.Optional[BoundedExecutor] = None,
+    ):
+        self._classifier = models.current
+        self._executor = executor
+        self._batcher = batcher
+        self._cache = cache
+        self._monitor = monitor
+        self._fallback_executor = fallback_executor or executor
+
+    async def explain_prediction(self, data: schemas.PredictionRequest) -> tp.Tuple[tp.Dict[str, int], str]:
+        with stage_timer("preprocess"):
+            preprocessed_data = preprocess_input(data)
+        key = feature_key("explain", preprocessed_data)
+        version = self._classifier.version
+        importance_levels = self._cache.get(key, version) if self._cache is not None else None
 
-    def explain_prediction(self, data: schemas.PredictionRequest):
-        preprocessed_data = preprocess_input(data)
-        importance_levels = self._classifier.get_importance_values(preprocessed_data)
+        if importance_levels is None:
+            with stage_timer("explain"):
+                if self._batcher is not None:
+                    importance_levels, version = await self._batcher.submit(preprocessed_data[0])
+                else:
+                    importance_levels = await self._executor.run(self._classifier.get_importance_values, preprocessed_data)
+            if self._cache is not None:
+                self._cache.put(key, version, importance_levels)
+        if self._monitor is not None:
+            self._monitor.record_levels([importance_levels])
         print(importance_levels)
-        return importance_levels
+        return importance_levels, version
+
+    async def explain_degraded(self, data: schemas.PredictionRequest) -> tp.Tuple[tp.Dict[str, int], str, str]:
+        """(levels, model version, source) for an overloaded /explain: the cached exact levels when
+        there are some, otherwise approximate ones. Approximate levels are not cached or monitored."""
+        with stage_timer("preprocess"):
+            preprocessed_data = preprocess_input(data)
+        version = self._classifier.version
+        if self._cache is not None:
+            importance_levels = self._cache.get(feature_key("explain", preprocessed_data), version)
+            if importance_levels is not None:
+                return importance_levels, version, "cached"
+        with stage_timer("explain_approximate"):
+            importance_levels = await self._fallback_executor.run(
+                self._classifier.get_approximate_importance_values, preprocessed_data
+            )
+        return importance_levels, version, "approximate"
+
+    async def explain_batch(
+        self, items: tp.List[tp.Dict[str, tp.Any]]
+    ) -> tp.Tuple[tp.List[schemas.BatchExplainItem], str]:
+        results = [schemas.BatchExplainItem(index=i) for i in range(len(items))]
+        valid_rows, valid_indices = validate_batch(items, results)
+
+        if valid_rows:
+            with stage_timer("preprocess_batch"):
+                features = preprocess_batch(valid_rows)
+            with stage_timer("explain_batch"):
+                levels = await self._executor.run(self._classifier.get_importance_values_batch, features)
+            if self._monitor is not None:
+                self._monitor.record_levels(levels)
+            for i, row_levels in zip(valid_indices, levels):
+                results[i].levels = schemas.FeatureExplainLevels(**row_levels)
+
+        return results, self._classifier.version
     
 
-class UserDataService:
-    def __init__(self, db: ShelveDB):
+class CounterfactualService:
+    def __init__(self, models: ModelManager, executor: BoundedExecutor, grid: counterfactuals.CounterfactualGrid):
+        self._classifier = models.current
+        self._executor = executor
+        self._grid = grid
+
+    async def counterfactuals(self, data: schemas.CounterfactualRequest) -> schemas.CounterfactualResponse:
+        with stage_timer("preprocess"):
+            preprocessed_data = preprocess_input(data)
+        with stage_timer("counterfactuals"):
+            result = await self._executor.run(
+                counterfactuals.search,
+                self._classifier,
+                self._grid,
+                preprocessed_data[0],
+                data.max_changes,
+                data.limit or config.COUNTERFACTUAL_LIMIT,
+                config.COUNTERFACTUAL_MAX_CANDIDATES,
+                config.COUNTERFACTUAL_BUDGET_MS / 1000,
+            )
+        return schemas.CounterfactualResponse(**result, model_version=self._classifier.version)
+
+
+class StorageService:
+    def __init__(self, db: BaseDB, executor: BoundedExecutor, writer: tp.Optional[WriteBehindQueue] = None):
         self._db = db
-    
-    def store_data(self, data: schemas.PredictionRequest):
+        self._executor = executor
+        self._writer = writer
+
+    async def _write(self, key: str, value: tp.Any):
+        if self._writer is not None:
+            await self._writer.enqueue(self._db, key, value)
+            return
+        try:
+            await self._executor.run(self._db.write, key, value)
+        except Exception as e:
+            count("service_errors_total", service=type(self).__name__)
+            print(str(e))
+
+
+class UserDataService(StorageService):
+    async def store_data(self, data: schemas.PredictionRequest):
         user: schemas.User = data.user
         user_key = hash_user_key(user.name, user.email)
 
         value_data = data.model_dump()
         value_data.pop("user")
-        try:
-            self._db.write(user_key, value_data)
-        except Exception as e:
-            print(str(e))
+        await self._write(user_key, value_data)
 
 
-class CreditApplicationService:
-    def __init__(self, db: ShelveDB):
-        self._db = db
-    
-    def create_application(self, data: schemas.CreditApplication):
+class ScoreService:
+    def __init__(
+        self,
+        models: ModelManager,
+        executor: BoundedExecutor,
+        user_data_service: UserDataService,
+        cache: tp.Optional[ResultCache] = None,
+        monitor: tp.Optional[FeatureMonitor] = None,
+    ):
+        self._models = models
+        self._classifier = models.current
+        self._executor = executor
+        self._user_data_service = user_data_service
+        self._cache = cache
+        self._monitor = monitor
+
+    async def score(self, data: schemas.ScoreRequest) -> schemas.ScoreResponse:
+        with stage_timer("preprocess"):
+            preprocessed_data = preprocess_input(data)
+        key = feature_key("score", preprocessed_data)
+        result = self._cache.get(key, self._classifier.version) if self._cache is not None else None
+
+        if result is None:
+            with stage_timer("score"):
+                result = (await self._executor.run(self._classifier.score_batch, preprocessed_data))[0]
+            if self._cache is not None:
+                self._cache.put(key, self._classifier.version, result)
+            self._models.maybe_shadow(preprocessed_data, [result])
+        if self._monitor is not None:
+            self._monitor.record(preprocessed_data, (result['probability'],))
+            self._monitor.record_levels([result['importance_levels']])
+
+        # The score is already computed (and cached), so a full write queue only costs the stored copy.
+        stored, store_error = False, None
+        if data.store_data:
+            try:
+                await self._user_data_service.store_data(
+                    schemas.PredictionRequest(**data.model_dump(exclude={"store_data"}))
+                )
+                stored = True
+            except WriteQueueFull as e:
+                store_error = str(e)
+
+        return schemas.ScoreResponse(
+            pred=result['prediction'],
+            proba=result['probability'],
+            explanation=schemas.FeatureExplainLevels(**result['importance_levels']),
+            stored=stored,
+            store_error=store_error,
+            model_version=self._classifier.version,
+        )
+
+
+class CreditApplicationService(StorageService):
+    async def create_application(self, data: schemas.CreditApplication):
         user: schemas.User = data.user.model_dump_json()
-        try:
-            self._db.write(user, data.text)
-        except Exception as e:
-            print(str(e))
+        await self._write(user, data.text)
 
 
-class ReportModelService:
-    def __init__(self, db: ShelveDB):
-        self._db = db
-    
-    def report_model(self, data: schemas.ModelReport):
+class ReportModelService(StorageService):
+    async def report_model(self, data: schemas.ModelReport):
         user: schemas.User = data.user.model_dump_json()
-        try:
-            self._db.write(user, {"issue_type": data.issue_type, "text": data.text})
-        except Exception as e:
-            print(str(e))
+        await self._write(user, {"issue_type": data.issue_type, "text": data.text})
+
+
+
+class ExportService:
+    FORMATS = {
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv",
+        "parquet": "application/vnd.apache.parquet",
+    }
+
+    def __init__(self, db: BaseDB, page_size: int):
+        self._db = db
+        self._page_size = page_size
+
+    def _records(self, cursor, prefix, since, until) -> tp.Iterator[dict]:
+        for key, value, updated_at in self._db.iter_items(cursor, prefix, since, until, self._page_size):
+            yield {"key": key, "updated_at": updated_at, "value": value}
+
+    def stream(
+        self,
+        fmt: str,
+        cursor: tp.Optional[str] = None,
+        prefix: tp.Optional[str] = None,
+        since: tp.Optional[float] = None,
+        until: tp.Optional[float] = None,
+    ) -> tp.Iterator[bytes]:
+        records = self._records(cursor, prefix, since, until)
+        if fmt == "ndjson":
+            return (json.dumps(record, default=str).encode() + b"\n" for record in records)
+        if fmt == "csv":
+            return self._csv_chunks(records)
+        if fmt == "parquet":
+            return self._parquet_chunks(records)
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {sorted(self.FORMATS)}")
+
+    def _pages(self, records: tp.Iterator[dict]) -> tp.Iterator[tp.List[dict]]:
+        page = []
+        for record in records:
+            page.append(record)
+            if len(page) == self._page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def _csv_chunks(self, records: tp.Iterator[dict]) -> tp.Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["key", "updated_at", "value"])
+        for page in self._pages(records):
+            for record in page:
+                writer.writerow([record["key"], record["updated_at"], json.dumps(record["value"], default=str)])
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    def _parquet_chunks(self, records: tp.Iterator[dict]) -> tp.Iterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([("key", pa.string()), ("updated_at", pa.float64()), ("value", pa.string())])
+        sink = io.BytesIO()
+        with pq.ParquetWriter(sink, schema) as writer:
+            for page in self._pages(records):
+                writer.write_table(pa.Table.from_pylist(
+                    [{**record, "value": json.dumps(record["value"], default=str)} for record in page],
+                    schema=schema,
+                ))
+                # Each page becomes one row group; hand its bytes out as soon as it is written.
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+        yield sink.getvalue()
@@ -0,0 +1,29 @@
+import contextlib
+import time
+import typing as tp
+
+
+class StartupReport:
+    """Wall time spent per import / initialization phase of a worker."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: tp.Dict[str, float] = {}
+        self.ready_after: tp.Optional[float] = None
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def mark_ready(self):
+        self.ready_after = time.perf_counter() - self.started
+
+    def report(self, model_load_times: tp.Optional[tp.Dict[str, float]] = None) -> dict:
+        phases = dict(self.phases)
+        for name, seconds in (model_load_times or {}).items():
+            phases[f"model.{name}"] = seconds
+        return {"phases_seconds": phases, "ready_after_seconds": self.ready_after}
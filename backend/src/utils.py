@@ -1,24 +1,16 @@
 import numpy as np
 from backend.src.schemas import PredictionRequest
+from backend.src.features import FEATURE_COLUMNS, feature_registry
+import typing as tp
 import hashlib
 
+
 def preprocess_input(data: PredictionRequest) -> np.ndarray:
-    response = np.array([
-        data.flag_own_car,
-        data.flag_own_realty,
-        data.cnt_children,
-        data.amt_income_total, 
-        data.code_income_type,
-        data.code_education_type,
-        data.code_family_status,
-        data.code_housing_type,
-        data.age_group,
-        data.years_employed_cat,
-        data.code_occupation_type,
-        data.cnt_family_members
-    ]).reshape(1, -1)
+    return preprocess_batch([data])
+
 
-    return response.reshape(1, -1)
+def preprocess_batch(data: tp.Sequence[PredictionRequest]) -> np.ndarray:
+    return feature_registry().matrix(data)
 
 
 def hash_user_key(name: str, email: str) -> str:
@@ -0,0 +1,116 @@
+import asyncio
+import time
+import typing as tp
+from backend.src.db import BaseDB
+from backend.src.executors import BoundedExecutor
+from backend.src.metrics import REGISTRY
+
+FLUSH_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class WriteBehindQueue:
+    """Buffers storage writes in memory and flushes them with `write_many`.
+
+    A flush happens once `batch_size` records are pending or `flush_interval_ms`
+    has passed. Producers wait up to `put_timeout_ms` for free space and then
+    get `WriteQueueFull`, which the API turns into a 503 (or, for /score,
+    `stored=false` on an otherwise successful response).
+    """
+
+    def __init__(
+        self,
+        executor: BoundedExecutor,
+        max_size: int,
+        batch_size: int,
+        flush_interval_ms: float,
+        put_timeout_ms: float,
+    ):
+        self._executor = executor
+        self._max_size = max_size
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval_ms / 1000
+        self._put_timeout = put_timeout_ms / 1000
+        self._queue: tp.Optional[asyncio.Queue] = None
+        self._task: tp.Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.flushed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.flush_latency = REGISTRY.histogram("write_behind_flush_seconds", FLUSH_LATENCY_BUCKETS)
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self._max_size)
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._closing = True
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def enqueue(self, db: BaseDB, key: str, value: tp.Any):
+        if self._queue is None or self._closing:
+            raise RuntimeError("Write-behind queue is not running")
+        try:
+            await asyncio.wait_for(self._queue.put((db, key, value)), self._put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise WriteQueueFull(f"Write queue is full ({self._max_size} pending records)")
+
+    async def _collect(self) -> list:
+        try:
+            batch = [await asyncio.wait_for(self._queue.get(), self._flush_interval)]
+        except asyncio.TimeoutError:
+            return []
+
+        deadline = time.perf_counter() + self._flush_interval
+        while len(batch) < self._batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0 or self._closing:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _flush(self, batch: list):
+        by_db: tp.Dict[int, tp.Tuple[BaseDB, list]] = {}
+        for db, key, value in batch:
+            by_db.setdefault(id(db), (db, []))[1].append((key, value))
+
+        started = time.perf_counter()
+        for db, items in by_db.values():
+            try:
+                await self._executor.run(db.write_many, items)
+                self.flushed += len(items)
+            except Exception as e:
+                self.failed += len(items)
+                print(str(e))
+        self.flush_latency.observe(time.perf_counter() - started)
+
+    async def _run(self):
+        while not (self._closing and self._queue.empty()):
+            batch = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self._max_size,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "flush_latency_seconds": self.flush_latency.snapshot(),
+        }
@@ -0,0 +1,54 @@
+"""Compare XGBClassifier.predict_proba with the flattened NumPy TreeEnsemble.
+
+Usage: python -m benchmarks.bench_tree_engine [--model model/xgboost_model.json]
+"""
+import argparse
+import time
+import numpy as np
+from xgboost import XGBClassifier
+from model.tree_engine import TreeEnsemble
+
+FEATURE_HIGH = (2, 2, 6, 1, 5, 5, 5, 6, 10, 4, 18, 8)
+INCOMES = (27000, 45000, 67500, 90000, 112500, 135000, 157500, 180000, 225000, 270000, 450000)
+
+
+def random_features(n_rows: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([rng.integers(0, high, n_rows) for high in FEATURE_HIGH])
+    features[:, 3] = rng.choice(INCOMES, n_rows)
+    return features
+
+
+def timeit(fn, features: np.ndarray, repeat: int) -> float:
+    fn(features)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(features)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="model/xgboost_model.json")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    booster = XGBClassifier()
+    booster.load_model(args.model)
+    engine = TreeEnsemble.from_json(args.model)
+
+    features = random_features(10_000)
+    max_diff = np.abs(engine.predict_proba(features) - booster.predict_proba(features)).max()
+    print(f"max |p_numpy - p_xgboost| over {len(features)} rows: {max_diff:.2e}")
+
+    print(f"{'rows':>6} {'xgboost ms':>12} {'numpy ms':>10} {'speedup':>8}")
+    for n_rows in (1, 8, 32, 128, 1024):
+        rows = features[:n_rows]
+        repeat = max(args.repeat // n_rows, 5)
+        xgb_ms = timeit(booster.predict_proba, rows, repeat)
+        numpy_ms = timeit(engine.predict_proba, rows, repeat)
+        print(f"{n_rows:>6} {xgb_ms:>12.3f} {numpy_ms:>10.3f} {xgb_ms / numpy_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Compare two benchmark JSON reports and flag latency regressions.
+
+Usage: python -m benchmarks.compare baseline.json current.json [--metric p95_ms] [--threshold 0.10]
+Exits with status 1 when any matching result regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def load_results(path: str) -> tuple:
+    with open(path) as f:
+        report = json.load(f)
+    return report.get("commit"), {result["name"]: result for result in report["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--metric", default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    baseline_commit, baseline = load_results(args.baseline)
+    current_commit, current = load_results(args.current)
+    print(f"{args.metric}: {baseline_commit} -> {current_commit}")
+
+    regressions = 0
+    for name in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[name].get(args.metric), current[name].get(args.metric)
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        regressed = change > args.threshold
+        regressions += regressed
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:<44} {before:>10.3f} {after:>10.3f} {change:>+8.1%} {flag}")
+
+    for name in sorted(baseline.keys() ^ current.keys()):
+        print(f"{name:<44} only in {'baseline' if name in baseline else 'current'}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Check that the batched native explanation path reproduces the original
+per-request shap.Explainer + scalar bucketing output.
+
+Usage: python -m benchmarks.explain_regression [--rows 200]
+Exits with status 1 on any mismatch.
+"""
+import argparse
+import sys
+import time
+import typing as tp
+import numpy as np
+import shap
+from model.xgboost_classifier import XGBoostModel, importance_levels
+from benchmarks.bench_tree_engine import random_features
+
+
+def reference_levels(shap_values: np.ndarray) -> tp.List[int]:
+    levels = []
+
+    neutral_threshold = np.percentile(np.abs(shap_values), 20)
+    max_pos = shap_values[shap_values > 0].max(initial=0)
+    max_neg = shap_values[shap_values < 0].min(initial=0)
+
+    for val in shap_values:
+        if abs(val) < neutral_threshold:
+            levels.append(0)
+        elif val > 0:
+            if val > 0.5 * max_pos:
+                levels.append(-2)
+            else:
+                levels.append(-1)
+        else:
+            if val < 0.5 * max_neg:
+                levels.append(2)
+            else:
+                levels.append(1)
+
+    return levels
+
+
+def synthetic_contributions(n_rows: int, seed: int = 0) -> np.ndarray:
+    # Exercise ties, exact zeros and one-signed rows on top of random values.
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n_rows, 12)).astype(np.float32)
+    values[::7] = np.round(values[::7])
+    values[1::11, :6] = 0
+    values[2::13] = np.abs(values[2::13])
+    values[3::17] = -np.abs(values[3::17])
+    values[4::19] = 0
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="model/xgboost_model.json")
+    parser.add_argument("--rows", type=int, default=200)
+    args = parser.parse_args()
+
+    mismatches = 0
+
+    values = synthetic_contributions(args.rows)
+    expected = np.array([reference_levels(row) for row in values])
+    mismatches += int((importance_levels(values) != expected).any(axis=1).sum())
+    print(f"bucketing: {args.rows} synthetic rows, {mismatches} mismatching")
+
+    model = XGBoostModel(args.model)
+    explainer = shap.Explainer(model._model)
+    features = random_features(args.rows, seed=1)
+
+    started = time.perf_counter()
+    legacy = [
+        dict(zip(model._model.get_booster().feature_names, reference_levels(explainer(row[None, :]).values.flatten())))
+        for row in features
+    ]
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = model.get_importance_values_batch(features)
+    batched_s = time.perf_counter() - started
+
+    model_mismatches = sum(a != b for a, b in zip(legacy, batched))
+    mismatches += model_mismatches
+    print(f"model: {args.rows} rows, {model_mismatches} mismatching; "
+          f"per-request shap {legacy_s:.2f}s, batched native {batched_s:.3f}s")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
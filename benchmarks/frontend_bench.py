@@ -0,0 +1,154 @@
+"""Frontend submit latency and chart memory.
+
+`submit` times one form submit against a running API, calling /score and
+/counterfactuals one after the other, concurrently, and concurrently behind a
+bounded per-payload cache (payloads repeat as users resubmit the same form).
+`sessions` renders the decision factors chart N times, once the old way
+(pyplot figures that are never closed) and once through
+client.render_feature_importance, and reports RSS afterwards.
+
+Usage: python -m benchmarks.frontend_bench [--url http://127.0.0.1:8000] [--submits 100]
+       [--unique 20] [--sessions 200] [--output frontend.json]
+"""
+import argparse
+import collections
+import json
+import os
+import resource
+import time
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.payloads import PayloadGenerator
+from benchmarks.report import summarize, write_report
+from backend.src.utils import FEATURE_COLUMNS
+from frontend.client import evaluate, evaluate_sequential, make_session, render_feature_importance
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Peak rather than current RSS, but still shows growth on platforms without /proc.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class BoundedCache:
+    """Stand-in for st.cache_data(max_entries=...): LRU keyed by the JSON payload."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: tp.OrderedDict[str, tp.Any] = collections.OrderedDict()
+
+    def get_or_compute(self, payload: dict, compute: tp.Callable[[], tp.Any]) -> tp.Any:
+        key = json.dumps(payload, sort_keys=True)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        value = self.entries[key] = compute()
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value
+
+
+def bench_submits(args, payloads: tp.List[dict]) -> tp.List[dict]:
+    session = make_session(pool_size=8)
+    executor = ThreadPoolExecutor(max_workers=8)
+    cache = BoundedCache(args.cache_entries)
+    variants = {
+        "submit.sequential": lambda payload: evaluate_sequential(session, args.url, payload, False),
+        "submit.concurrent": lambda payload: evaluate(session, executor, args.url, payload, False),
+        "submit.concurrent_cached": lambda payload: cache.get_or_compute(
+            payload, lambda: evaluate(session, executor, args.url, payload, False)
+        ),
+    }
+
+    results = []
+    for name, submit in variants.items():
+        submit(payloads[0])
+        latencies = []
+        for payload in payloads:
+            started = time.perf_counter()
+            submit(payload)
+            latencies.append(time.perf_counter() - started)
+        result = {"name": name, **summarize(latencies)}
+        results.append(result)
+        print(f"{name:<28} p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms mean={result['mean_ms']:>8.2f}ms")
+    executor.shutdown()
+    return results
+
+
+def render_pyplot_unclosed(importances: tp.Dict[str, int]):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(10, 6), dpi=100)
+    ax = fig.add_subplot()
+    ax.barh(list(importances), list(importances.values()))
+    plt.tight_layout()
+    return fig
+
+
+def bench_sessions(args, explanations: tp.List[tp.Dict[str, int]]) -> tp.List[dict]:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    # The leaking variant goes last so its figures do not inflate the other measurement.
+    variants = {
+        "sessions.figure_png": render_feature_importance,
+        "sessions.pyplot_unclosed": render_pyplot_unclosed,
+    }
+
+    results = []
+    for name, render in variants.items():
+        render(explanations[0])
+        rss_before = rss_mb()
+        latencies = []
+        for i in range(args.sessions):
+            started = time.perf_counter()
+            render(explanations[i % len(explanations)])
+            latencies.append(time.perf_counter() - started)
+        rss_after = rss_mb()
+        result = {
+            "name": name,
+            "sessions": args.sessions,
+            "rss_before_mb": rss_before,
+            "rss_after_mb": rss_after,
+            "rss_growth_mb": rss_after - rss_before,
+            **summarize(latencies),
+        }
+        results.append(result)
+        print(
+            f"{name:<28} render p50={result['p50_ms']:>8.2f}ms "
+            f"rss {rss_before:.1f}MB -> {rss_after:.1f}MB after {args.sessions} sessions"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of a running API server")
+    parser.add_argument("--submits", type=int, default=100)
+    parser.add_argument("--unique", type=int, default=20, help="Distinct payloads among the submits")
+    parser.add_argument("--cache-entries", type=int, default=256)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--skip-submits", action="store_true", help="Only run the chart memory benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write a JSON report to this path")
+    args = parser.parse_args()
+
+    generator = PayloadGenerator(seed=args.seed)
+    unique = generator.prediction_requests(args.unique)
+    payloads = [unique[i] for i in generator.rng.integers(0, len(unique), args.submits)]
+    # Explanation levels take the same -2..2 values as real responses.
+    explanations = [
+        dict(zip(FEATURE_COLUMNS, generator.rng.integers(-2, 3, len(FEATURE_COLUMNS)).tolist()))
+        for _ in range(32)
+    ]
+
+    results = [] if args.skip_submits else bench_submits(args, payloads)
+    results += bench_sessions(args, explanations)
+    write_report(args.output, "frontend", results, url=None if args.skip_submits else args.url)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Replay generated requests against the API and report latency per endpoint.
+
+By default the app runs in-process (ASGI transport, storage in a temporary
+directory); pass --url to target a running server instead.
+
+Usage: python -m benchmarks.load_test [--url http://127.0.0.1:8000]
+       [--endpoints /predict /explain] [--concurrency 1 8 32] [--requests 200]
+       [--output load.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import tempfile
+import time
+import typing as tp
+import httpx
+from benchmarks.payloads import ENDPOINT_PAYLOADS, PayloadGenerator
+from benchmarks.report import summarize, write_report
+
+
+@contextlib.asynccontextmanager
+async def in_process_client():
+    with tempfile.TemporaryDirectory() as db_dir:
+        from backend.src import db
+
+        db.DB_DIR = db_dir
+        from backend.main import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                yield client
+
+
+async def run_level(
+    client: httpx.AsyncClient, endpoint: str, payloads: tp.List[dict], concurrency: int
+) -> dict:
+    latencies = []
+    errors = 0
+    pending = iter(payloads)
+
+    async def worker():
+        nonlocal errors
+        for payload in pending:
+            started = time.perf_counter()
+            try:
+                response = await client.post(endpoint, json=payload)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "name": f"{endpoint}@c{concurrency}",
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(payloads) / elapsed,
+        **summarize(latencies),
+    }
+
+
+async def run(args) -> tp.List[dict]:
+    generator = PayloadGenerator(seed=args.seed)
+    if args.url:
+        client_context = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        client_context = in_process_client()
+
+    results = []
+    async with client_context as client:
+        client.cookies.set("store_data", "true")
+        for endpoint in args.endpoints:
+            make_payload = getattr(generator, ENDPOINT_PAYLOADS[endpoint])
+            for _ in range(args.warmup):
+                await client.post(endpoint, json=make_payload())
+            for concurrency in args.concurrency:
+                payloads = [make_payload() for _ in range(args.requests)]
+                result = await run_level(client, endpoint, payloads, concurrency)
+                results.append(result)
+                print(
+                    f"{endpoint:<20} c={concurrency:<4} {result['throughput_rps']:>9.1f} req/s "
+                    f"p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms "
+                    f"p99={result['p99_ms']:>8.2f}ms errors={result['errors']}"
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="Base URL of a running server; in-process when omitted")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINT_PAYLOADS), choices=list(ENDPOINT_PAYLOADS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write a JSON report to this path")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    write_report(
+        args.output, "load_test", results,
+        target=args.url or "in-process", requests_per_level=args.requests,
+    )
+
+
+if __name__ == "__main__":
+    main()
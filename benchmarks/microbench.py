@@ -0,0 +1,58 @@
+"""Microbenchmarks for the per-request hot path: preprocessing, prediction, explanation.
+
+Usage: python -m benchmarks.microbench [--repeat 500] [--batch 64] [--output micro.json]
+"""
+import argparse
+import time
+import typing as tp
+from backend.src.schemas import PredictionRequest
+from backend.src.utils import preprocess_batch, preprocess_input
+from benchmarks.payloads import PayloadGenerator
+from benchmarks.report import summarize, write_report
+from model.xgboost_classifier import XGBoostModel
+
+
+def bench(name: str, fn: tp.Callable, inputs: tp.Sequence, repeat: int, rows: int = 1) -> dict:
+    fn(inputs[0])
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        latencies.append(time.perf_counter() - started)
+    result = {"name": name, "rows": rows, **summarize(latencies)}
+    result["rows_per_s"] = rows * repeat / sum(latencies)
+    print(f"{name:<36} p50={result['p50_ms']:>8.3f}ms p99={result['p99_ms']:>8.3f}ms {result['rows_per_s']:>12.0f} rows/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="model/xgboost_model.json")
+    parser.add_argument("--engine", default="xgboost", choices=["xgboost", "numpy", "auto"])
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write a JSON report to this path")
+    args = parser.parse_args()
+
+    requests = [PredictionRequest(**payload) for payload in PayloadGenerator(args.seed).prediction_requests(256)]
+    model = XGBoostModel(model_path=args.model, engine=args.engine)
+    rows = [preprocess_input(request) for request in requests]
+    batches = [preprocess_batch(requests[i:i + args.batch]) for i in range(0, len(requests) - args.batch + 1, args.batch)]
+    batch_repeat = max(args.repeat // args.batch, 10)
+
+    results = [
+        bench("preprocess_input", preprocess_input, requests, args.repeat),
+        bench("XGBoostModel.predict", model.predict, rows, args.repeat),
+        bench("XGBoostModel.get_importance_values", model.get_importance_values, rows, args.repeat),
+        bench(f"XGBoostModel.predict_batch[{args.batch}]", model.predict_batch, batches, batch_repeat, args.batch),
+        bench(
+            f"XGBoostModel.get_importance_values_batch[{args.batch}]",
+            model.get_importance_values_batch, batches, batch_repeat, args.batch,
+        ),
+    ]
+    write_report(args.output, "microbench", results, model_version=model.version, engine=args.engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Realistic request payloads built from the training label encodings."""
+import json
+import typing as tp
+import numpy as np
+
+LABEL_ENCODERS_PATH = "model/data/label_encoders.json"
+
+# PredictionRequest field -> key in label_encoders.json
+ENCODED_FIELDS = {
+    "flag_own_car": "FLAG_OWN_CAR",
+    "flag_own_realty": "FLAG_OWN_REALTY",
+    "code_income_type": "CODE_INCOME_TYPE",
+    "code_education_type": "CODE_EDUCATION_TYPE",
+    "code_family_status": "CODE_FAMILY_STATUS",
+    "code_housing_type": "CODE_HOUSING_TYPE",
+    "code_occupation_type": "CODE_OCCUPATION_TYPE",
+    "age_group": "age_group",
+    "years_employed_cat": "years_employed_cat",
+}
+BOOLEAN_FIELDS = ("flag_own_car", "flag_own_realty")
+INCOMES = (27000, 45000, 67500, 90000, 112500, 135000, 157500, 180000, 225000, 270000, 450000)
+ISSUE_TYPES = ("wrong_prediction", "unclear_explanation", "other")
+
+
+def load_encoders(path: str = LABEL_ENCODERS_PATH) -> tp.Dict[str, tp.List[int]]:
+    with open(path) as f:
+        encoders = json.load(f)
+    return {field: sorted(int(code) for code in encoders[key]) for field, key in ENCODED_FIELDS.items()}
+
+
+class PayloadGenerator:
+    def __init__(self, seed: int = 0, encoders_path: str = LABEL_ENCODERS_PATH):
+        self.rng = np.random.default_rng(seed)
+        self.codes = load_encoders(encoders_path)
+        self.counter = 0
+
+    def user(self) -> dict:
+        self.counter += 1
+        return {"name": f"bench user {self.counter}", "email": f"bench{self.counter}@example.com"}
+
+    def prediction_request(self) -> dict:
+        payload = {"user": self.user()}
+        for field, codes in self.codes.items():
+            value = int(self.rng.choice(codes))
+            payload[field] = bool(value) if field in BOOLEAN_FIELDS else value
+        children = int(self.rng.choice((0, 0, 0, 1, 1, 2, 3)))
+        payload["cnt_children"] = children
+        payload["cnt_family_members"] = children + int(self.rng.integers(1, 3))
+        payload["amt_income_total"] = int(self.rng.choice(INCOMES))
+        return payload
+
+    def score_request(self) -> dict:
+        return {**self.prediction_request(), "store_data": bool(self.rng.random() < 0.5)}
+
+    def credit_application(self) -> dict:
+        return {"user": self.user(), "text": "Requesting a credit line for home improvements."}
+
+    def model_report(self) -> dict:
+        return {"user": self.user(), "issue_type": str(self.rng.choice(ISSUE_TYPES)), "text": "The decision looks off."}
+
+    def prediction_requests(self, n: int) -> tp.List[dict]:
+        return [self.prediction_request() for _ in range(n)]
+
+
+# endpoint -> generator method producing its request body
+ENDPOINT_PAYLOADS = {
+    "/predict": "prediction_request",
+    "/explain": "prediction_request",
+    "/score": "score_request",
+    "/store_user_data": "prediction_request",
+    "/create_application": "credit_application",
+    "/report_model": "model_report",
+}
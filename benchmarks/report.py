@@ -0,0 +1,49 @@
+"""Shared timing summaries and the JSON report format used by the benchmarks."""
+import json
+import platform
+import subprocess
+import time
+import typing as tp
+import numpy as np
+
+
+def summarize(latencies_s: tp.Sequence[float]) -> dict:
+    if not latencies_s:
+        return {"count": 0}
+    ms = np.asarray(latencies_s) * 1000
+    p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+def git_commit() -> tp.Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(path: tp.Optional[str], suite: str, results: tp.List[dict], **meta):
+    """Write `results` as JSON; each result has a unique "name" that compare.py matches on."""
+    report = {
+        "suite": suite,
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        **meta,
+        "results": results,
+    }
+    if path:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {path}")
+    return report
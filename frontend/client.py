@@ -0,0 +1,138 @@
+"""Backend calls and chart rendering used by frontend.py.
+
+Nothing here imports Streamlit, so benchmarks/frontend_bench.py can time it
+directly; frontend.py adds the per-payload caches on top.
+"""
+import io
+import typing as tp
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+
+BG_COLOR = "#0e1117"       # Streamlit dark background
+WIDGET_BG = "#262730"      # Streamlit widget background
+TEXT_COLOR = "#fafafa"     # Light text for contrast
+PRIMARY = "#ff4b4b"        # Streamlit red
+SECONDARY = "#21c354"      # Streamlit green
+GRID_COLOR = "#555555"     # Dark grid lines
+BAR_EDGE = "#444444"       # Bar edge color
+
+FEATURE_NAMES = {
+    'amt_income_total': 'Annual Income',
+    'code_income_type': 'Income Type',
+    'code_education_type': 'Education',
+    'age_group': 'Age Group',
+    'years_employed_cat': 'Employment',
+    'cnt_family_members': 'Family Size',
+    'cnt_children': 'Children',
+    'flag_own_realty': 'Owns Property',
+    'flag_own_car': 'Owns Car',
+    'code_family_status': 'Marital Status',
+    'code_housing_type': 'Housing',
+    'code_occupation_type': 'Occupation'
+}
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """Keep-alive session whose connection pool fits `pool_size` concurrent calls."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def post_json(session: requests.Session, url: str, payload: dict, timeout: float) -> dict:
+    response = session.post(url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def evaluate(
+    session: requests.Session,
+    executor: ThreadPoolExecutor,
+    base_url: str,
+    payload: dict,
+    store_data: bool,
+    timeout: float = 10.0,
+) -> tp.Tuple[dict, tp.Optional[dict]]:
+    """Scores an application and looks for counterfactuals at the same time.
+
+    Counterfactuals are only a hint, so failing to get them does not fail the
+    evaluation; a failed /score raises.
+    """
+    score = executor.submit(post_json, session, f"{base_url}/score", {**payload, "store_data": store_data}, timeout)
+    counterfactuals = executor.submit(post_json, session, f"{base_url}/counterfactuals", payload, timeout)
+    try:
+        counterfactuals_result = counterfactuals.result()
+    except requests.RequestException:
+        counterfactuals_result = None
+    return score.result(), counterfactuals_result
+
+
+def evaluate_sequential(
+    session: requests.Session, base_url: str, payload: dict, store_data: bool, timeout: float = 10.0
+) -> tp.Tuple[dict, tp.Optional[dict]]:
+    """Same calls as `evaluate`, one after the other; kept as the benchmark baseline."""
+    score = post_json(session, f"{base_url}/score", {**payload, "store_data": store_data}, timeout)
+    try:
+        counterfactuals = post_json(session, f"{base_url}/counterfactuals", payload, timeout)
+    except requests.RequestException:
+        counterfactuals = None
+    return score, counterfactuals
+
+
+def render_feature_importance(importances: tp.Dict[str, int], dpi: int = 80) -> bytes:
+    """Draws the decision factors chart and returns it as PNG bytes.
+
+    The figure is created without pyplot, so it is not registered in pyplot's
+    global figure list and is freed as soon as this function returns.
+    """
+    factors = sorted(importances.items(), key=lambda item: abs(item[1]))
+    names = [FEATURE_NAMES.get(name, name) for name, _ in factors]
+    values = [value for _, value in factors]
+    colors = [SECONDARY if value > 0 else PRIMARY for value in values]
+
+    fig = Figure(figsize=(10, 6), facecolor=BG_COLOR, dpi=dpi)
+    ax = fig.add_subplot(facecolor=BG_COLOR)
+    ax.barh(names, values, color=colors, edgecolor=BAR_EDGE, linewidth=0.8)
+
+    ax.set_title('Credit Decision Factors', pad=20, fontsize=14, color=TEXT_COLOR, fontweight='bold')
+    ax.set_xlabel('Impact Score', fontsize=12, color=TEXT_COLOR)
+    ax.tick_params(axis='both', colors=TEXT_COLOR, labelsize=10)
+    for spine in ax.spines.values():
+        spine.set_color(GRID_COLOR)
+
+    ax.axvline(0, color=TEXT_COLOR, linestyle='--', linewidth=1.0, alpha=0.8)
+    ax.grid(axis='x', color=GRID_COLOR, linestyle=':', linewidth=0.7, alpha=0.8)
+    ax.set_axisbelow(True)
+
+    legend = ax.legend(
+        handles=[Patch(color=SECONDARY, label='Positive'), Patch(color=PRIMARY, label='Negative')],
+        title='Impact Direction',
+        facecolor=WIDGET_BG,
+        edgecolor=GRID_COLOR,
+        title_fontsize=10,
+        fontsize=9,
+        bbox_to_anchor=(1.02, 1),
+        loc='upper left'
+    )
+    legend.get_title().set_color(TEXT_COLOR)
+    for text in legend.get_texts():
+        text.set_color(TEXT_COLOR)
+
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", facecolor=BG_COLOR)
+    fig.clear()
+    return buffer.getvalue()
+
+
+def fetch_features(session: requests.Session, base_url: str, timeout: float = 10.0) -> tp.Dict[str, tp.Dict[int, str]]:
+    """feature -> {code: label} from GET /features; the API accepts either form back."""
+    response = session.get(f"{base_url}/features", timeout=timeout)
+    response.raise_for_status()
+    return {spec["name"]: {int(code): label for code, label in spec["labels"].items()} for spec in response.json()}
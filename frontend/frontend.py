@@ -1,87 +1,36 @@
 import streamlit as st
-import pandas as pd
-import requests
-import matplotlib.pyplot as plt
-import seaborn as sns
+from concurrent.futures import ThreadPoolExecutor
 from greetings import greetings_page
+from client import FEATURE_NAMES, evaluate, fetch_features, make_session, render_feature_importance
 
-INCOME_TYPES = {
-    "Commercial associate": 0,
-    "Pensioner": 1,
-    "State servant": 2,
-    "Student": 3,
-    "Working": 4,
-}
-
-EDUCATION_TYPES = {
-    "Academic degree": 0,
-    "Higher education": 1,
-    "Incomplete higher": 2,
-    "Lower secondary": 3,
-    "Secondary / secondary special": 4,
+# Category options come from the API's feature registry (GET /features); these only
+# change how some of its labels are displayed.
+EMPLOYMENT_DURATION = {
+    "0": "No experience",
+    "1-3": "1-3 years",
+    "4-10": "4-10 years",
+    "10+": "10+ years",
 }
 
-FAMILY_STATUSES = {
-    "Civil marriage": 0,
-    "Married": 1,
-    "Separated": 2,
-    "Single / not married": 3,
-    "Widow": 4,
-}
+API_BASE_URL = "http://localhost:8000"
+# Shared by all sessions; each submit runs /score and /counterfactuals side by side.
+BACKEND_WORKERS = 8
+RESULT_CACHE_MAX_ENTRIES = 256
+RESULT_CACHE_TTL_S = 600
+CHART_CACHE_MAX_ENTRIES = 64
 
-HOUSING_TYPES = {
-    "Co-op apartment": 0,
-    "House / apartment": 1,
-    "Municipal apartment": 2,
-    "Office apartment": 3,
-    "Rented apartment": 4,
-    "With parents": 5,
-}
 
-OCCUPATION_TYPES = {
-    "Accountants": 0,
-    "Cleaning staff": 1,
-    "Cooking staff": 2,
-    "Core staff": 3,
-    "Drivers": 4,
-    "HR staff": 5,
-    "High skill tech staff": 6,
-    "IT staff": 7,
-    "Laborers": 8,
-    "Low-skill Laborers": 9,
-    "Managers": 10,
-    "Medicine staff": 11,
-    "Private service staff": 12,
-    "Realty agents": 13,
-    "Sales staff": 14,
-    "Secretaries": 15,
-    "Security staff": 16,
-    "Waiters/barmen staff": 17,
-}
+# Streamlit re-executes this script on every interaction; cache_resource keeps one
+# session (and its connection pool) and one thread pool for the whole server.
+@st.cache_resource
+def get_session():
+    return make_session(pool_size=BACKEND_WORKERS)
 
-AGE_GROUPS = {
-    0: "18-22",
-    1: "23-29",
-    2: "30-34",
-    3: "35-39",
-    4: "40-44",
-    5: "45-49",
-    6: "50-54",
-    7: "55-59",
-    8: "60-64",
-    9: "65-69",
-}
 
-EMPLOYMENT_DURATION = {
-    0: "No experience",
-    1: "1-3 years",
-    3: "4-10 years",
-    2: "10+ years",
-}
+@st.cache_resource
+def get_executor():
+    return ThreadPoolExecutor(max_workers=BACKEND_WORKERS, thread_name_prefix="backend")
 
-API_BASE_URL = "http://localhost:8000"
-requests_session = requests.Session()
-requests_session.headers.update({"Connection": "keep-alive"})
 
 st.set_page_config(
     page_title="Credit Scoring System",
@@ -89,81 +38,40 @@ st.set_page_config(
     layout="wide"
 )
 
-def plot_feature_importance(importances):
-    BG_COLOR = "#0e1117"       # Streamlit dark background
-    WIDGET_BG = "#262730"      # Streamlit widget background
-    TEXT_COLOR = "#fafafa"     # Light text for contrast
-    PRIMARY = "#ff4b4b"        # Streamlit red
-    SECONDARY = "#21c354"      # Streamlit green
-    GRID_COLOR = "#555555"     # Dark grid lines
-    BAR_EDGE = "#444444"       # Bar edge color
+requests_session = get_session()
 
-    fig = plt.figure(figsize=(10, 6), facecolor=BG_COLOR, dpi=100)
-    ax = fig.add_subplot(facecolor=BG_COLOR)
-    fig.patch.set_facecolor(BG_COLOR)
 
-    
-    feature_names = {
-        'amt_income_total': 'Annual Income',
-        'code_income_type': 'Income Type',
-        'code_education_type': 'Education',
-        'age_group': 'Age Group',
-        'years_employed_cat': 'Employment',
-        'cnt_family_members': 'Family Size',
-        'cnt_children': 'Children',
-        'flag_own_realty': 'Owns Property',
-        'flag_own_car': 'Owns Car',
-        'code_family_status': 'Marital Status',
-        'code_housing_type': 'Housing',
-        'code_occupation_type': 'Occupation'
-    }
-
-    df = pd.DataFrame({
-        'Factor': [feature_names.get(col, col) for col in importances.index],
-        'Impact': importances.values,
-        'Effect': ['Positive' if x > 0 else 'Negative' for x in importances.values]
-    }).sort_values('Impact', key=abs, ascending=False)
-
-    sns.barplot(
-        data=df,
-        x='Impact',
-        y='Factor',
-        hue='Effect',
-        palette={'Positive': SECONDARY, 'Negative': PRIMARY},
-        ax=ax,
-        dodge=False,
-        linewidth=0.8,
-        edgecolor=BAR_EDGE,
-        saturation=0.9
-    )
+@st.cache_resource(ttl=RESULT_CACHE_TTL_S)
+def get_features():
+    """feature -> {code: label}, as served by the API."""
+    return fetch_features(requests_session, API_BASE_URL)
 
-    ax.set_title('Credit Decision Factors', 
-                pad=20, fontsize=14, color=TEXT_COLOR, fontweight='bold')
-    ax.set_xlabel('Impact Score', fontsize=12, color=TEXT_COLOR)
-    ax.set_ylabel('')
-    
-    ax.tick_params(axis='both', colors=TEXT_COLOR, labelsize=10)
-    for spine in ax.spines.values():
-        spine.set_color(GRID_COLOR)
-    
-    ax.axvline(0, color=TEXT_COLOR, linestyle='--', linewidth=1.0, alpha=0.8)
-    ax.grid(axis='x', color=GRID_COLOR, linestyle=':', linewidth=0.7, alpha=0.8)
-
-    legend = ax.legend(
-        title='Impact Direction',
-        facecolor=WIDGET_BG,
-        edgecolor=GRID_COLOR,
-        title_fontsize=10,
-        fontsize=9,
-        bbox_to_anchor=(1.02, 1),
-        loc='upper left'
-    )
-    legend.get_title().set_color(TEXT_COLOR)
-    for text in legend.get_texts():
-        text.set_color(TEXT_COLOR)
 
-    plt.tight_layout()
-    return fig
+@st.cache_data(max_entries=RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL_S, show_spinner=False)
+def cached_evaluation(payload):
+    """Score and counterfactuals per payload without storing it; failed calls raise and are not cached."""
+    return evaluate(requests_session, get_executor(), API_BASE_URL, payload, False)
+
+
+def evaluate_application(payload, store_data):
+    # /score also stores the application, so a submit that asks for storage always reaches the API.
+    if store_data:
+        return evaluate(requests_session, get_executor(), API_BASE_URL, payload, True)
+    return cached_evaluation(payload)
+
+
+@st.cache_data(max_entries=CHART_CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_chart(importances):
+    return render_feature_importance(importances)
+
+
+def describe_change(feature, value):
+    if feature == "amt_income_total":
+        return f"{FEATURE_NAMES[feature]}: ${value:,}"
+    if feature in ("flag_own_car", "flag_own_realty"):
+        return f"{FEATURE_NAMES[feature]}: {'Yes' if value else 'No'}"
+    label = get_features().get(feature, {}).get(value, value)
+    return f"{FEATURE_NAMES.get(feature, feature)}: {EMPLOYMENT_DURATION.get(label, label)}"
 
 
 def show_feedback_form(user_data=None):
@@ -328,6 +236,8 @@ elif st.session_state["page"] == "main":
 
     st.divider()
 
+    features = get_features()
+
     with st.form("credit_form"):
         st.subheader("🔍 Your Information")
 
@@ -335,7 +245,7 @@ elif st.session_state["page"] == "main":
 
         with col1:
             name = st.text_input("Full Name")
-            age_group = st.selectbox("Age Group", options=list(AGE_GROUPS.keys()), format_func=lambda x: AGE_GROUPS[x])
+            age_group = st.selectbox("Age Group", options=list(features["age_group"].values()))
             flag_own_car = st.selectbox("Owns a Car", options=[0, 1], format_func=lambda x: "Yes" if x == 1 else "No", index=1)
             flag_own_realty = st.selectbox("Owns Property", options=[0, 1], format_func=lambda x: "Yes" if x == 1 else "No", index=1)
             cnt_children = st.number_input("Number of Children", min_value=0, value=0)
@@ -343,14 +253,14 @@ elif st.session_state["page"] == "main":
 
         with col2:
             email = st.text_input("Email")
-            code_income_type = st.selectbox("Income Type", options=list(INCOME_TYPES.keys()))
-            code_education_type = st.selectbox("Education Level", options=list(EDUCATION_TYPES.keys()))
-            code_family_status = st.selectbox("Marital Status", options=list(FAMILY_STATUSES.keys()))
-            code_housing_type = st.selectbox("Housing Type", options=list(HOUSING_TYPES.keys()))
+            code_income_type = st.selectbox("Income Type", options=list(features["code_income_type"].values()))
+            code_education_type = st.selectbox("Education Level", options=list(features["code_education_type"].values()))
+            code_family_status = st.selectbox("Marital Status", options=list(features["code_family_status"].values()))
+            code_housing_type = st.selectbox("Housing Type", options=list(features["code_housing_type"].values()))
             cnt_family_members = st.number_input("Family Members", min_value=1, value=1)
 
-        years_employed_cat = st.selectbox("Employment Duration", options=list(EMPLOYMENT_DURATION.keys()), format_func=lambda x: EMPLOYMENT_DURATION[x])
-        code_occupation_type = st.selectbox("Occupation", options=list(OCCUPATION_TYPES.keys()))
+        years_employed_cat = st.selectbox("Employment Duration", options=list(EMPLOYMENT_DURATION), format_func=lambda x: EMPLOYMENT_DURATION[x])
+        code_occupation_type = st.selectbox("Occupation", options=list(features["code_occupation_type"].values()))
 
         submitted = st.form_submit_button("Get Credit Score")
 
@@ -364,21 +274,23 @@ elif st.session_state["page"] == "main":
             "flag_own_realty": flag_own_realty,
             "cnt_children": cnt_children,
             "amt_income_total": amt_income_total,
-            "code_income_type": list(INCOME_TYPES.keys()).index(code_income_type),
-            "code_education_type": list(EDUCATION_TYPES.keys()).index(code_education_type),
-            "code_family_status": list(FAMILY_STATUSES.keys()).index(code_family_status),
-            "code_housing_type": list(HOUSING_TYPES.keys()).index(code_housing_type),
+            "code_income_type": code_income_type,
+            "code_education_type": code_education_type,
+            "code_family_status": code_family_status,
+            "code_housing_type": code_housing_type,
             "age_group": age_group,
             "years_employed_cat": years_employed_cat,
-            "code_occupation_type": list(OCCUPATION_TYPES.keys()).index(code_occupation_type),
+            "code_occupation_type": code_occupation_type,
             "cnt_family_members": cnt_family_members
         }
 
         st.session_state["application_data"] = input_payload
 
+        store_requested = st.session_state.get("store_data", "Yes") == "Yes"
         with st.spinner("Evaluating..."):
-            predict_response = requests_session.post(f"{API_BASE_URL}/predict", json=input_payload)
-            result = predict_response.json()
+            result, counterfactuals = evaluate_application(input_payload, store_requested)
+            if store_requested and not result.get("stored", True):
+                st.warning("Your data could not be saved right now; submit again to retry.")
 
             probability = result["proba"]
             decision = result["pred"]
@@ -390,19 +302,14 @@ elif st.session_state["page"] == "main":
             else:
                 st.error("❌ Likely Declined")
 
-            requests_session.post(
-                f"{API_BASE_URL}/update_settings",
-                params={"store_data": st.session_state.get("store_data", "Yes") == "Yes"}
-            )
-            requests_session.post(f"{API_BASE_URL}/store_user_data", json=input_payload)
-
-            explain_response = requests_session.post(f"{API_BASE_URL}/explain", json=input_payload)
-            explanation = pd.Series(explain_response.json())
-
             st.markdown("#### 🔍 Decision Factors")
-            plt = plot_feature_importance(explanation)
-            st.pyplot(plt)
-            
+            st.image(cached_chart(result["explanation"]))
+
+            if decision == 1 and counterfactuals and counterfactuals["counterfactuals"]:
+                st.markdown("#### 🔁 What Could Change the Decision")
+                for counterfactual in counterfactuals["counterfactuals"]:
+                    changes = ", ".join(describe_change(feature, value) for feature, value in counterfactual["changes"].items())
+                    st.markdown(f"- {changes} (approval probability {counterfactual['proba'] * 100:.1f}%)")
             
             st.session_state["show_feedback"] = True
 
@@ -0,0 +1,124 @@
+"""Local directory of versioned model artifacts with an ACTIVE pointer.
+
+Layout:
+    <root>/ACTIVE                      name of the version workers should serve
+    <root>/<name>/xgboost_model.json
+    <root>/<name>/metadata.json
+
+Versions are named after the content hash of their model file, so registering
+the same artifact twice is a no-op. Switching versions rewrites ACTIVE
+atomically; running workers pick it up through the admin endpoint or by polling.
+
+Usage: python -m model.registry list
+       python -m model.registry register model/xgboost_model.json [--report model/train_report.json] [--activate]
+       python -m model.registry activate <name>
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import typing as tp
+from model.tree_engine import file_version
+
+MODEL_FILE = "xgboost_model.json"
+SHARED_FILE = "xgboost_model.bin"
+
+
+class ModelRegistry:
+    def __init__(self, root: str):
+        self.root = root
+
+    @property
+    def _active_file(self) -> str:
+        return os.path.join(self.root, "ACTIVE")
+
+    def model_path(self, name: str) -> str:
+        path = os.path.join(self.root, name, MODEL_FILE)
+        if os.path.basename(name) != name or not os.path.exists(path):
+            raise KeyError(f"Unknown model version {name!r}")
+        return path
+
+    def shared_path(self, name: str) -> str:
+        return os.path.join(self.root, name, SHARED_FILE)
+
+    def versions(self) -> tp.List[dict]:
+        if not os.path.isdir(self.root):
+            return []
+        active = self.active()
+        versions = []
+        for name in sorted(os.listdir(self.root)):
+            metadata_path = os.path.join(self.root, name, "metadata.json")
+            if not os.path.exists(metadata_path):
+                continue
+            with open(metadata_path) as f:
+                versions.append({**json.load(f), "name": name, "active": name == active})
+        return sorted(versions, key=lambda version: version.get("registered_at", 0))
+
+    def register(self, model_path: str, report_path: tp.Optional[str] = None) -> str:
+        name = file_version(model_path)
+        directory = os.path.join(self.root, name)
+        if os.path.exists(os.path.join(directory, "metadata.json")):
+            return name
+
+        # Copy into a temporary directory and rename, so a half-copied version is never visible.
+        staging = os.path.join(self.root, f".{name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        shutil.copyfile(model_path, os.path.join(staging, MODEL_FILE))
+        metadata = {"model_version": name, "source": os.path.abspath(model_path), "registered_at": time.time()}
+        if report_path is not None:
+            with open(report_path) as f:
+                metadata["report"] = json.load(f)
+        with open(os.path.join(staging, "metadata.json"), "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(staging, directory)
+        return name
+
+    def active(self) -> tp.Optional[str]:
+        try:
+            with open(self._active_file) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, name: str):
+        self.model_path(name)
+        tmp_path = f"{self._active_file}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(name)
+        os.replace(tmp_path, self._active_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default="model/registry")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    register = commands.add_parser("register")
+    register.add_argument("model_path")
+    register.add_argument("--report", default=None)
+    register.add_argument("--activate", action="store_true")
+    activate = commands.add_parser("activate")
+    activate.add_argument("name")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "list":
+        for version in registry.versions():
+            marker = "*" if version["active"] else " "
+            registered = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(version["registered_at"]))
+            print(f"{marker} {version['name']}  {registered}  {version['source']}")
+    elif args.command == "register":
+        name = registry.register(args.model_path, args.report)
+        print(f"Registered {name}")
+        if args.activate:
+            registry.activate(name)
+            print(f"Activated {name}")
+    else:
+        registry.activate(args.name)
+        print(f"Activated {args.name}")
+
+
+if __name__ == "__main__":
+    main()
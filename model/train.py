@@ -0,0 +1,263 @@
+"""Scripted training pipeline replacing model/train.ipynb.
+
+Reads application_record.csv / credit_record.csv in typed chunks, builds the
+serving features with the same vectorized binning the API uses, caches them
+as parquet, and fits a histogram-based XGBoost model with early stopping.
+
+Usage: python -m model.train [--data-dir model/data] [--balance weight|smote|none]
+       [--max-rounds 1000] [--early-stopping 50] [--no-cache]
+Writes model/xgboost_model.json, model/data/label_encoders.json and a JSON
+report with per-phase timings and test metrics.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import time
+import typing as tp
+import numpy as np
+import pandas as pd
+from backend.src.encoding import RAW_COLUMNS, age_labels, employment_labels
+from backend.src.utils import FEATURE_COLUMNS
+from model.tree_engine import file_version
+
+# Bump when feature engineering changes so stale parquet caches are ignored.
+FEATURES_VERSION = 1
+
+APPLICATION_DTYPES = {
+    "ID": "int64",
+    "FLAG_OWN_CAR": "category",
+    "FLAG_OWN_REALTY": "category",
+    "CNT_CHILDREN": "int16",
+    "AMT_INCOME_TOTAL": "float64",
+    "NAME_INCOME_TYPE": "category",
+    "NAME_EDUCATION_TYPE": "category",
+    "NAME_FAMILY_STATUS": "category",
+    "NAME_HOUSING_TYPE": "category",
+    "DAYS_BIRTH": "int32",
+    "DAYS_EMPLOYED": "int32",
+    "OCCUPATION_TYPE": "category",
+    "CNT_FAM_MEMBERS": "float32",
+}
+CREDIT_DTYPES = {"ID": "int64", "MONTHS_BALANCE": "int16", "STATUS": "category"}
+# Credit record statuses meaning 60+ days overdue; any of them marks the applicant as bad.
+BAD_STATUSES = ("2", "3", "4", "5")
+
+
+class Timings:
+    def __init__(self):
+        self.phases: tp.Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+            print(f"{name}: {self.phases[name]:.2f}s")
+
+
+def read_applications(path: str, chunk_size: int) -> pd.DataFrame:
+    chunks = pd.read_csv(path, usecols=list(APPLICATION_DTYPES), dtype=APPLICATION_DTYPES, chunksize=chunk_size)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_targets(path: str, chunk_size: int) -> pd.Series:
+    """Per-ID target: 1 when any month of the credit record is 60+ days overdue."""
+    targets = []
+    for chunk in pd.read_csv(path, usecols=list(CREDIT_DTYPES), dtype=CREDIT_DTYPES, chunksize=chunk_size):
+        bad = chunk["STATUS"].isin(BAD_STATUSES).astype(np.int8)
+        targets.append(bad.groupby(chunk["ID"]).max())
+    return pd.concat(targets).groupby(level=0).max().rename("target")
+
+
+def build_features(applications: pd.DataFrame, targets: pd.Series) -> tp.Tuple[pd.DataFrame, tp.Dict[str, tp.Dict[int, str]]]:
+    """Returns encoded features (FEATURE_COLUMNS order plus `target`) and the label encoders."""
+    data = applications.join(targets, on="ID", how="inner")
+    columns = {column: data[raw_column] for column, (raw_column, _) in RAW_COLUMNS.items()}
+    columns["age_group"] = age_labels(columns["age_group"])
+    columns["years_employed_cat"] = employment_labels(columns["years_employed_cat"])
+    # Rows with any missing value (mostly OCCUPATION_TYPE, or ages outside the bins) are dropped, as in the notebook.
+    complete = pd.concat(columns, axis=1).notna().all(axis=1)
+    data = data[complete]
+
+    encoded, encoders = {}, {}
+    for column in FEATURE_COLUMNS:
+        _, encoder = RAW_COLUMNS[column]
+        values = columns[column][complete]
+        if encoder is None:
+            encoded[column] = values.astype(np.int64).to_numpy()
+        else:
+            # Codes are the sorted label order, as sklearn's LabelEncoder assigns them.
+            classes, codes = np.unique(values.astype(str).to_numpy(), return_inverse=True)
+            encoded[column] = codes.astype(np.int64)
+            encoders[encoder] = {code: str(label) for code, label in enumerate(classes)}
+
+    features = pd.DataFrame(encoded, index=data.index)
+    features["target"] = data["target"].astype(np.int64).to_numpy()
+    encoders["target"] = {0: "0", 1: "1"}
+    return features.reset_index(drop=True), encoders
+
+
+def cache_key(*paths: str) -> str:
+    digest = hashlib.sha256(f"v{FEATURES_VERSION}".encode())
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def load_features(args, timings: Timings) -> tp.Tuple[pd.DataFrame, tp.Dict[str, tp.Dict[int, str]], bool]:
+    applications_path = os.path.join(args.data_dir, "application_record.csv")
+    credit_path = os.path.join(args.data_dir, "credit_record.csv")
+    key = cache_key(applications_path, credit_path)
+    features_path = os.path.join(args.cache_dir, f"features-{key}.parquet")
+    encoders_path = os.path.join(args.cache_dir, f"encoders-{key}.json")
+
+    if args.cache and os.path.exists(features_path) and os.path.exists(encoders_path):
+        with timings.phase("load_cached_features"):
+            features = pd.read_parquet(features_path)
+            with open(encoders_path) as f:
+                encoders = {name: {int(code): label for code, label in mapping.items()} for name, mapping in json.load(f).items()}
+        return features, encoders, True
+
+    with timings.phase("read_applications"):
+        applications = read_applications(applications_path, args.chunk_size)
+    with timings.phase("read_credit_records"):
+        targets = read_targets(credit_path, args.chunk_size)
+    with timings.phase("build_features"):
+        features, encoders = build_features(applications, targets)
+
+    if args.cache:
+        with timings.phase("write_feature_cache"):
+            os.makedirs(args.cache_dir, exist_ok=True)
+            features.to_parquet(features_path, index=False)
+            with open(encoders_path, "w") as f:
+                json.dump(encoders, f)
+    return features, encoders, False
+
+
+def balance(x: pd.DataFrame, y: pd.Series, method: str, seed: int) -> tp.Tuple[pd.DataFrame, pd.Series, float]:
+    """Returns the (possibly resampled) training data and scale_pos_weight."""
+    if method == "smote":
+        from imblearn.over_sampling import SMOTE
+
+        x, y = SMOTE(random_state=seed).fit_resample(x, y)
+        return x, y, 1.0
+    if method == "weight":
+        positives = int(y.sum())
+        return x, y, (len(y) - positives) / max(positives, 1)
+    return x, y, 1.0
+
+
+def evaluate(model, x: pd.DataFrame, y: pd.Series) -> dict:
+    from sklearn.metrics import accuracy_score, f1_score, log_loss, precision_score, recall_score, roc_auc_score
+
+    probabilities = model.predict_proba(x)[:, 1]
+    predictions = (probabilities > 0.5).astype(int)
+    return {
+        "rows": len(y),
+        "accuracy": accuracy_score(y, predictions),
+        "precision": precision_score(y, predictions, zero_division=0),
+        "recall": recall_score(y, predictions, zero_division=0),
+        "f1": f1_score(y, predictions, zero_division=0),
+        "roc_auc": roc_auc_score(y, probabilities) if y.nunique() > 1 else None,
+        "log_loss": log_loss(y, probabilities, labels=[0, 1]),
+    }
+
+
+def train(args) -> dict:
+    from sklearn.model_selection import train_test_split
+    from xgboost import XGBClassifier
+
+    timings = Timings()
+    features, encoders, cached = load_features(args, timings)
+    x, y = features[list(FEATURE_COLUMNS)], features["target"]
+
+    with timings.phase("split"):
+        x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=args.seed, stratify=y)
+        x_train, x_valid, y_train, y_valid = train_test_split(
+            x_train, y_train, test_size=0.125, random_state=args.seed, stratify=y_train
+        )
+    # Only the training split is resampled, so validation and test keep the real class balance.
+    with timings.phase("balance"):
+        x_train, y_train, scale_pos_weight = balance(x_train, y_train, args.balance, args.seed)
+
+    params = {
+        "tree_method": "hist",
+        "max_bin": args.max_bin,
+        "n_jobs": args.threads,
+        "learning_rate": args.learning_rate,
+        "max_depth": args.max_depth,
+        "n_estimators": args.max_rounds,
+        "early_stopping_rounds": args.early_stopping,
+        "eval_metric": "logloss",
+        "scale_pos_weight": scale_pos_weight,
+        "random_state": args.seed,
+    }
+    model = XGBClassifier(**params)
+    with timings.phase("fit"):
+        model.fit(x_train, y_train, eval_set=[(x_valid, y_valid)], verbose=args.verbose)
+    # Save only the trees up to the best iteration: serving (NumPy engine, pred_contribs) uses every saved tree.
+    # The fitted model already predicts with iterations up to best_iteration, so the metrics below match the file.
+    best_iteration = int(model.best_iteration)
+    booster = model.get_booster()[: best_iteration + 1]
+
+    with timings.phase("evaluate"):
+        metrics = {"valid": evaluate(model, x_valid, y_valid), "test": evaluate(model, x_test, y_test)}
+
+    with timings.phase("save"):
+        booster.save_model(args.model_output)
+        with open(args.encoders_output, "w") as f:
+            json.dump(encoders, f, indent=4)
+
+    report = {
+        "model": args.model_output,
+        "model_version": file_version(args.model_output),
+        "label_encoders": args.encoders_output,
+        "features_cached": cached,
+        "rows": {"total": len(features), "train": len(y_train), "valid": len(y_valid), "test": len(y_test)},
+        "positive_rate": float(y.mean()),
+        "best_iteration": best_iteration,
+        "params": params,
+        "balance": args.balance,
+        "metrics": metrics,
+        "timings_seconds": timings.phases,
+    }
+    with open(args.report_output, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="model/data")
+    parser.add_argument("--cache-dir", default="model/data/cache")
+    parser.add_argument("--no-cache", dest="cache", action="store_false")
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    parser.add_argument("--balance", default="weight", choices=["weight", "smote", "none"])
+    parser.add_argument("--learning-rate", type=float, default=0.05)
+    parser.add_argument("--max-depth", type=int, default=12)
+    parser.add_argument("--max-bin", type=int, default=256)
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--early-stopping", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--model-output", default="model/xgboost_model.json")
+    parser.add_argument("--encoders-output", default="model/data/label_encoders.json")
+    parser.add_argument("--report-output", default="model/train_report.json")
+    args = parser.parse_args()
+
+    report = train(args)
+    test = report["metrics"]["test"]
+    print(
+        f"Model {report['model_version']} ({report['best_iteration'] + 1} trees): "
+        f"test accuracy {test['accuracy']:.4f}, f1 {test['f1']:.4f}, roc_auc {test['roc_auc']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
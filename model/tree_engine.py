@@ -0,0 +1,214 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import typing as tp
+import numpy as np
+
+BINARY_MAGIC = b"XGBTREE1"
+ARRAY_NAMES = ("feature", "threshold", "children", "default_left", "value", "roots")
+ALIGNMENT = 64
+
+
+def file_version(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class TreeEnsemble:
+    """Flattened XGBoost tree ensemble evaluated with vectorized NumPy traversal.
+
+    All trees share contiguous node arrays. `children[2 * node]` is the left and
+    `children[2 * node + 1]` the right child; leaves point to themselves so every
+    row can be advanced `max_depth` times without per-tree branching.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        default_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        base_margin: float,
+        feature_names: tp.List[str],
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_margin = base_margin
+        self.feature_names = feature_names
+
+    @classmethod
+    def from_json(cls, model_path: str) -> "TreeEnsemble":
+        with open(model_path) as f:
+            learner = json.load(f)["learner"]
+
+        if learner["objective"]["name"] != "binary:logistic":
+            raise ValueError(f"Unsupported objective {learner['objective']['name']}")
+
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+        trees = learner["gradient_booster"]["model"]["trees"]
+
+        feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        max_depth, offset = 0, 0
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported")
+
+            tree_left = np.asarray(tree["left_children"], dtype=np.int32)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int32)
+            n_nodes = len(tree_left)
+            is_leaf = tree_left == -1
+            own = np.arange(n_nodes, dtype=np.int32)
+
+            feature.append(np.where(is_leaf, 0, tree["split_indices"]).astype(np.int32))
+            threshold.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            left.append(np.where(is_leaf, own, tree_left) + offset)
+            right.append(np.where(is_leaf, own, tree_right) + offset)
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            value.append(np.where(is_leaf, tree["split_conditions"], 0).astype(np.float32))
+            roots.append(offset)
+
+            depth = np.zeros(n_nodes, dtype=np.int32)
+            for node in range(n_nodes):
+                if not is_leaf[node]:
+                    depth[tree_left[node]] = depth[tree_right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+            offset += n_nodes
+
+        children = np.empty(2 * offset, dtype=np.int32)
+        children[0::2] = np.concatenate(left)
+        children[1::2] = np.concatenate(right)
+
+        return cls(
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            children=children,
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            base_margin=float(np.log(base_score / (1 - base_score))),
+            feature_names=learner.get("feature_names", []),
+        )
+
+    def save(self, path: str, metadata: tp.Optional[dict] = None):
+        """Writes the arrays into one file: magic, header length, JSON header,
+        then each array 64-byte aligned so it can be mapped without copying."""
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in ARRAY_NAMES}
+        header = {
+            "max_depth": self.max_depth,
+            "base_margin": self.base_margin,
+            "feature_names": self.feature_names,
+            "metadata": metadata or {},
+            "arrays": {},
+        }
+
+        # Offsets are relative to the aligned start of the data section.
+        offset = 0
+        for name, array in arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": array.shape, "offset": offset}
+            offset += _aligned(array.nbytes)
+
+        header_bytes = json.dumps(header).encode()
+        data_start = _aligned(len(BINARY_MAGIC) + 8 + len(header_bytes))
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(BINARY_MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + header["arrays"][name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def read_header(path: str) -> tp.Tuple[dict, int]:
+        with open(path, "rb") as f:
+            if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError(f"{path} is not a tree ensemble binary")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        return header, _aligned(len(BINARY_MAGIC) + 8 + header_len)
+
+    @classmethod
+    def load(cls, path: str) -> "TreeEnsemble":
+        """Maps the binary read-only; processes mapping the same file share its pages."""
+        header, data_start = cls.read_header(path)
+
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec["offset"]).reshape(spec["shape"])
+
+        return cls(
+            **arrays,
+            max_depth=header["max_depth"],
+            base_margin=header["base_margin"],
+            feature_names=header["feature_names"],
+        )
+
+    @classmethod
+    def open_shared(cls, binary_path: str, model_path: str, model_version: str) -> "TreeEnsemble":
+        """Loads the mapped binary, converting `model_path` first if the binary
+        is missing or was built from a different model version."""
+        try:
+            stale = cls.read_header(binary_path)[0]["metadata"].get("model_version") != model_version
+        except (FileNotFoundError, ValueError):
+            stale = True
+        if stale:
+            cls.from_json(model_path).save(binary_path, {"model_version": model_version})
+        return cls.load(binary_path)
+
+    def predict_margin(self, features: np.ndarray) -> np.ndarray:
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        n_rows, n_features = features.shape
+        flat = features.ravel()
+        has_missing = bool(np.isnan(flat).any())
+
+        row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+
+        for _ in range(self.max_depth):
+            values = flat.take(row_offsets + self.feature.take(nodes))
+            go_right = values >= self.threshold.take(nodes)
+            if has_missing:
+                go_right = np.where(np.isnan(values), ~self.default_left.take(nodes), go_right)
+            nodes = self.children.take(2 * nodes + go_right)
+
+        return self.value.take(nodes).sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        proba = 1 / (1 + np.exp(-self.predict_margin(features)))
+        return np.column_stack([1 - proba, proba])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert an XGBoost JSON model into the mappable tree ensemble binary.")
+    parser.add_argument("model_path", nargs="?", default="model/xgboost_model.json")
+    parser.add_argument("binary_path", nargs="?", default="model/xgboost_model.bin")
+    args = parser.parse_args()
+
+    TreeEnsemble.from_json(args.model_path).save(args.binary_path, {"model_version": file_version(args.model_path)})
+    print(f"Wrote {args.binary_path} ({os.path.getsize(args.binary_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,219 @@
-from xgboost import XGBClassifier
 import typing as tp
 import numpy as np
 from backend.src.schemas import PredictionRequest
-import shap
+import threading
+import time
+import contextlib
+from model.tree_engine import TreeEnsemble, file_version
+from backend.src.metrics import stage_timer, count
+
+# xgboost and shap are imported on first use: prediction through the NumPy
+# engine needs neither, and importing them dominates cold start.
 
 class XGBoostModel:
-    _instance = None
+    # One instance per model file: repeated construction (preload, workers,
+    # CLIs) reuses the loaded model, while a new registry version gets its own.
+    _instances: tp.Dict[str, "XGBoostModel"] = {}
+
+    def __new__(cls, model_path: str = "model/xgboost_model.json", *args, **kwargs):
+        instance = cls._instances.get(model_path)
+        if instance is None:
+            instance = cls._instances[model_path] = super(XGBoostModel, cls).__new__(cls)
+        return instance
+
+    @classmethod
+    def release(cls, model_path: str):
+        """Forgets the instance for `model_path`; it is freed once no request holds it."""
+        cls._instances.pop(model_path, None)
+
+    def __init__(
+        self,
+        model_path: str = "model/xgboost_model.json",
+        engine: str = "xgboost",
+        engine_max_rows: int = 32,
+        explain_engine: str = "native",
+        shared_path: tp.Optional[str] = None,
+    ):
+        if not hasattr(self, "version"):
+            self.model_path = model_path
+            self._explain_engine = explain_engine
+            self._booster_model = None
+            self._explainer = None
+            self._load_lock = threading.Lock()
+            self.load_times: tp.Dict[str, float] = {}
+
+            with self._timed("model_version"):
+                self.version = file_version(model_path)
+
+            if shared_path is not None:
+                # Shared serving: every prediction goes through the read-only
+                # mapped ensemble, the booster is only loaded for explanations.
+                with self._timed("load_engine"):
+                    self._engine = TreeEnsemble.open_shared(shared_path, model_path, self.version)
+                self._engine_max_rows = None
+            else:
+                # "numpy" always uses the flattened ensemble, "auto" only for small
+                # batches where booster call overhead dominates.
+                self._engine = None
+                if engine in ("numpy", "auto"):
+                    with self._timed("load_engine"):
+                        self._engine = TreeEnsemble.from_json(model_path)
+                self._engine_max_rows = engine_max_rows if engine == "auto" else None
+                if engine != "numpy":
+                    self._load_booster()
+            print(f"Model loaded from {model_path} (version {self.version})")
 
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(XGBoostModel, cls).__new__(cls, *args, **kwargs)
-        return cls._instance
+    @contextlib.contextmanager
+    def _timed(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.load_times[phase] = time.perf_counter() - started
 
-    def __init__(self, model_path: str = "model/xgboost_model.json"):
-        if not hasattr(self, "_model"):
-            self._model = XGBClassifier()
-            self._model.load_model(model_path)
-            print(f"Model loaded from {model_path}")
+    @property
+    def _model(self):
+        if self._booster_model is None:
+            self._load_booster()
+        return self._booster_model
 
-            self.explainer = shap.Explainer(self._model)
+    def _load_booster(self):
+        with self._load_lock:
+            if self._booster_model is None:
+                with self._timed("import_xgboost"):
+                    from xgboost import XGBClassifier
+                with self._timed("load_booster"):
+                    model = XGBClassifier()
+                    model.load_model(self.model_path)
+                self._booster_model = model
+
+    @property
+    def explainer(self):
+        """shap.Explainer, built on first use and only for explain_engine="shap".
+
+        Native pred_contribs is the same TreeSHAP computation the shap package
+        runs for XGBoost models, without its per-call overhead.
+        """
+        if self._explain_engine != "shap":
+            return None
+        if self._explainer is None:
+            booster = self._model
+            with self._load_lock:
+                if self._explainer is None:
+                    with self._timed("import_shap"):
+                        import shap
+                    with self._timed("build_explainer"):
+                        self._explainer = shap.Explainer(booster)
+        return self._explainer
+
+    def warm_up(self):
+        """Loads everything the explanation path needs and runs one row through it."""
+        with self._timed("warm_up"):
+            features = np.zeros((1, len(self._model.get_booster().feature_names)), dtype=np.int64)
+            self.predict_batch(features)
+            self.get_importance_values_batch(features)
 
     def predict(self, features: np.ndarray) -> dict:
-        prediction = self._model.predict(features)
-        probabilities = self._model.predict_proba(features).tolist()
-
-        return {
-            "prediction": int(prediction[0]),
-            "probability": probabilities[0][0],
-        }
-    
+        return self.predict_batch(features)[0]
+
+    def predict_batch(self, features: np.ndarray) -> tp.List[dict]:
+        with stage_timer("model.predict"):
+            probabilities = self._predict_proba(features)
+        predictions = (probabilities[:, 1] > 0.5).astype(int)
+
+        return [
+            {"prediction": int(pred), "probability": float(proba)}
+            for pred, proba in zip(predictions, probabilities[:, 0])
+        ]
+
+    def approval_probabilities(self, features: np.ndarray) -> np.ndarray:
+        """Class-0 probability per row, the `probability` of predict_batch without the per-row dicts."""
+        with stage_timer("model.predict"):
+            return self._predict_proba(features)[:, 0]
+
+    def _predict_proba(self, features: np.ndarray) -> np.ndarray:
+        if self._engine is not None and (self._engine_max_rows is None or len(features) <= self._engine_max_rows):
+            count("model_calls_total", method="predict", engine="numpy")
+            count("model_rows_total", len(features), method="predict")
+            return self._engine.predict_proba(features)
+        count("model_calls_total", method="predict", engine="xgboost")
+        count("model_rows_total", len(features), method="predict")
+        return self._model.predict_proba(features)
+
     def get_importance_values(self, features: np.ndarray) -> tp.Dict[str, int]:
-        shap_values = self.explainer(features).values.flatten()
-        feature_names = self._model.get_booster().feature_names
+        return self.get_importance_values_batch(features)[0]
 
-        levels = []
+    def get_importance_values_batch(self, features: np.ndarray) -> tp.List[tp.Dict[str, int]]:
+        explainer = self.explainer
+        if explainer is not None:
+            count("model_calls_total", method="explain", engine="shap")
+            count("model_rows_total", len(features), method="explain")
+            with stage_timer("model.contributions"):
+                contributions = explainer(features).values.reshape(len(features), -1)
+        else:
+            contributions = self._contributions(features, "explain")[:, :-1]
 
-        neutral_threshold = np.percentile(np.abs(shap_values), 20)
-        max_pos = shap_values[shap_values > 0].max(initial=0)
-        max_neg = shap_values[shap_values < 0].min(initial=0)
+        with stage_timer("model.levels"):
+            return self._levels_to_dicts(importance_levels(contributions))
 
-        for val in shap_values:
-            if abs(val) < neutral_threshold:
-                levels.append(0)
-            elif val > 0:
-                if val > 0.5 * max_pos:
-                    levels.append(-2)
-                else:
-                    levels.append(-1)
-            else:
-                if val < 0.5 * max_neg:
-                    levels.append(2)
-                else:
-                    levels.append(1)
+    def get_approximate_importance_values(self, features: np.ndarray) -> tp.Dict[str, int]:
+        """Levels from Saabas contributions (approx_contribs): a single path per tree instead of
+        TreeSHAP, a few hundred times cheaper. Used to answer /explain under overload."""
+        contributions = self._contributions(features, "explain_approximate", approximate=True)[:, :-1]
+        with stage_timer("model.levels"):
+            return self._levels_to_dicts(importance_levels(contributions))[0]
+
+    def score_batch(self, features: np.ndarray) -> tp.List[dict]:
+        contributions = self._contributions(features, "score")
+        # Tree contributions plus the bias column sum to the raw margin.
+        probabilities = 1 / (1 + np.exp(-contributions.sum(axis=1, dtype=np.float64)))
+        with stage_timer("model.levels"):
+            levels = self._levels_to_dicts(importance_levels(contributions[:, :-1]))
+
+        return [
+            {
+                "prediction": int(proba > 0.5),
+                "probability": float(1 - proba),
+                "importance_levels": row_levels,
+            }
+            for proba, row_levels in zip(probabilities, levels)
+        ]
+
+    def _contributions(self, features: np.ndarray, method: str, approximate: bool = False) -> np.ndarray:
+        from xgboost import DMatrix
+
+        count("model_calls_total", method=method, engine="native")
+        count("model_rows_total", len(features), method=method)
+        booster = self._model.get_booster()
+        with stage_timer("model.contributions"):
+            return booster.predict(
+                DMatrix(features, feature_names=booster.feature_names), pred_contribs=True, approx_contribs=approximate
+            )
+
+    def _levels_to_dicts(self, levels: np.ndarray) -> tp.List[tp.Dict[str, int]]:
+        feature_names = self._model.get_booster().feature_names
+        return [dict(zip(feature_names, row)) for row in levels.tolist()]
+
+
+def importance_levels(contributions: np.ndarray) -> np.ndarray:
+    """Buckets per-row SHAP contributions of shape (N, F) into levels -2..2.
 
-        importance_levels = {
-            feature_names[i]: levels[i] for i in range(len(feature_names))
-        }
+    Values below the row's 20th percentile of |contribution| are neutral (0);
+    the rest split at half of the row's largest positive / negative value.
+    Positive contributions push towards decline, hence the negative levels.
+    """
+    abs_values = np.abs(contributions)
+    neutral_threshold = np.percentile(abs_values, 20, axis=1, keepdims=True)
+    max_pos = np.where(contributions > 0, contributions, 0).max(axis=1, keepdims=True)
+    max_neg = np.where(contributions < 0, contributions, 0).min(axis=1, keepdims=True)
 
-        return importance_levels
\ No newline at end of file
+    return np.select(
+        [
+            abs_values < neutral_threshold,
+            (contributions > 0) & (contributions > 0.5 * max_pos),
+            contributions > 0,
+            contributions < 0.5 * max_neg,
+        ],
+        [0, -2, -1, 2],
+        default=1,
+    )